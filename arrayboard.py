@@ -0,0 +1,217 @@
+"""A compact, array-backed alternative to the HiveBoard tile storage
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+from hive import Color, Insect, Tile, Flat_Directions, IllegalMove, Violation
+
+COLORS = list(Color)
+INSECTS = list(Insect)
+
+TILES = [Tile(c, i) for c in COLORS for i in INSECTS]
+
+class ArrayBoard(object):
+    """
+    Stores the hive in a flat bytearray over a fixed-size axial grid
+    rather than a dict of lists.  Each cell holds the top tile of its
+    hex packed into one byte (bits 0-3 the tile code, bits 4-7 the
+    stack height, 0 when empty); the tiles beneath a climber live in a
+    small side-table keyed by cell index.
+
+    The public methods (piece_at, stack_at, neighbors, place, move,
+    remove) match HiveBoard's, taking axial coordinates; the index_*
+    methods and valid_placements/articulation_points work entirely
+    on integer cell indices.
+    """
+    def __init__(self, tile_orientation=Flat_Directions, size=64):
+        self.tile_orientation = tile_orientation
+        self.size = size
+        self.offset = size // 2
+        self.cells = bytearray(size * size)
+        self.occupied = set()
+        self.beneath = {}
+        self.deltas = tuple(d.value[0] * size + d.value[1] for d in tile_orientation)
+
+    @classmethod
+    def from_board(cls, board, size=64):
+        """Copies the tiles of a HiveBoard, preserving stack order"""
+        retval = cls(board.tile_orientation, size)
+        for coords, stack in board._pieces.items():
+            i = retval.index(coords)
+            retval.cells[i] = len(stack) << 4 | stack[-1].code
+            retval.occupied.add(i)
+            if len(stack) > 1:
+                retval.beneath[i] = list(stack[:-1])
+        return retval
+
+    def index(self, coords):
+        """
+        Returns the cell index of axial coordinates.  Two rings of
+        cells are kept empty around the edge, so the neighbors of a
+        tile's neighbors can be read without a bounds check.
+        """
+        q, r = coords[0] + self.offset, coords[1] + self.offset
+        if not (1 < q < self.size - 2 and 1 < r < self.size - 2):
+            raise IndexError('{0} lies outside the board'.format(coords))
+        return q * self.size + r
+
+    def coords(self, index):
+        """Returns the axial coordinates of a cell index"""
+        return (index // self.size - self.offset, index % self.size - self.offset)
+
+    def __contains__(self, coords):
+        try:
+            return self.cells[self.index(coords)] != 0
+        except IndexError:
+            return False
+
+    def __len__(self):
+        return len(self.occupied)
+
+    def move(self, origin, dest):
+        """
+        Naively removes the top tile in a stack (or single)
+        and places it in the new destination, without any
+        game-rule checking.
+        """
+        self.index_move(self.index(origin), self.index(dest))
+
+    def place(self, tile, coords):
+        """
+        Places a tile at the coordinates specified, raising
+        IllegalMove if the hex is already occupied.
+        """
+        i = self.index(coords)
+        if self.cells[i]:
+            raise IllegalMove(Violation.May_Not_Place_On_Other_Pieces)
+        self.index_push(i, tile)
+
+    def remove(self, coords):
+        """Naively removes the top tile in a stack (or single) and returns it"""
+        return self.index_pop(self.index(coords))
+
+    def piece_at(self, coords):
+        """Returns the tile (or topmost tile) at a given coordinate"""
+        cell = self.cells[self.index(coords)]
+        if not cell:
+            raise KeyError(coords)
+        return TILES[cell & 15]
+
+    def stack_at(self, coords):
+        """Returns a list of all tiles at a given coordinate"""
+        i = self.index(coords)
+        return self.beneath.get(i, []) + [self.piece_at(coords)]
+
+    def neighbors(self, coord):
+        i = self.index(coord)
+        for d in self.deltas:
+            cell = self.cells[i + d]
+            yield (self.coords(i + d), TILES[cell & 15] if cell else None)
+
+    def index_push(self, i, tile):
+        """Puts a tile on top of cell i"""
+        cell = self.cells[i]
+        if cell:
+            self.beneath.setdefault(i, []).append(TILES[cell & 15])
+        self.cells[i] = ((cell >> 4) + 1) << 4 | tile.code
+        self.occupied.add(i)
+
+    def index_pop(self, i):
+        """Takes the top tile off cell i and returns it"""
+        cell = self.cells[i]
+        if not cell:
+            raise KeyError(self.coords(i))
+
+        tile = TILES[cell & 15]
+        height = (cell >> 4) - 1
+
+        if height:
+            below = self.beneath[i]
+            self.cells[i] = height << 4 | below.pop().code
+            if not below:
+                del self.beneath[i]
+        else:
+            self.cells[i] = 0
+            self.occupied.discard(i)
+        return tile
+
+    def index_move(self, origin, dest):
+        self.index_push(dest, self.index_pop(origin))
+
+    def index_neighbors(self, i):
+        """Returns the six cell indices surrounding cell i"""
+        return [i + d for d in self.deltas]
+
+    def valid_placements(self, color):
+        """
+        Finds all hexes where a new, unused piece can be placed:
+        empty, touching the hive and touching no opposing tile.
+        """
+        friendly = COLORS.index(color) << 3
+        cells = self.cells
+        checked = set()
+
+        for i in self.occupied:
+            for d in self.deltas:
+                n = i + d
+                if n in checked or cells[n]:
+                    continue
+                checked.add(n)
+
+                for e in self.deltas:
+                    cell = cells[n + e]
+                    if cell and cell & 8 != friendly:
+                        break
+                else:
+                    yield self.coords(n)
+
+    @property
+    def articulation_points(self):
+        """
+        Returns the set of hexes whose tiles are pinned by the
+        one hive rule, found by an iterative Hopcroft-Tarjan search
+        over cell indices.
+        """
+        cells = self.cells
+        deltas = self.deltas
+        depth = {}
+        low = {}
+        articulation = set()
+
+        for root in self.occupied:
+            if root in depth:
+                continue
+
+            children = 0
+            depth[root] = low[root] = 0
+            stack = [(root, -1, iter(deltas))]
+
+            while stack:
+                current, parent, remaining = stack[-1]
+                for d in remaining:
+                    n = current + d
+                    if not cells[n] or n == parent:
+                        continue
+                    elif n in depth:
+                        low[current] = min(low[current], depth[n])
+                    else:
+                        depth[n] = low[n] = depth[current] + 1
+                        stack.append((n, current, iter(deltas)))
+                        break
+                else:
+                    stack.pop()
+                    if parent < 0:
+                        continue
+                    low[parent] = min(low[parent], low[current])
+                    if parent == root:
+                        children += 1
+                    elif low[current] >= depth[parent]:
+                        articulation.add(parent)
+
+            if children > 1:
+                articulation.add(root)
+
+        return frozenset(self.coords(i) for i in articulation)
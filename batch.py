@@ -0,0 +1,142 @@
+"""Encodes many HiveBoard positions at once as NumPy arrays, and scores them
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import numpy as np
+
+from hive import HiveBoard, Color, Flat_Directions
+
+#A batch of positions is a uint8 array of shape (boards, planes, size,
+#size): one plane per tile code (see hive.Tile) per stack level, the
+#bottom level first, so plane level * 16 + code is 1 wherever that
+#tile sits at that height, then a last plane (PINNED) that is 1 under
+#every tile pinned by the One Hive rule.  Tiles stacked higher than
+#the planes go share the top level.  Each board is laid on a size x
+#size window of axial (q, r) coordinates centered on its hive, which
+#must hold every tile.
+#
+#Encoded for a color, the planes are flipped so that color takes
+#codes 0-7 and its opponent 8-15, whichever color that is.
+
+WINDOW = 15 #the smallest window encode picks for itself
+HEIGHTS = 3
+
+#the six axial offsets, in order around a hex; both tile orientations
+#share them
+RING = HiveBoard.OFFSETS[Flat_Directions]
+
+OWN_QUEEN = 0
+OPP_QUEEN = 8
+PINNED = -1
+
+def center(board):
+    """The hex nearest the middle of the hive, (0,0) if it is empty"""
+    pieces = board._pieces
+    if not pieces:
+        return (0,0)
+    return (round(sum(q for q, r in pieces) / len(pieces)),
+            round(sum(r for q, r in pieces) / len(pieces)))
+
+def span(board):
+    """How far the hive reaches from its center along either axis"""
+    cq, cr = center(board)
+    return max([max(abs(q - cq), abs(r - cr)) for q, r in board._pieces] or [0])
+
+def encode(boards, colors=None, size=None, heights=HEIGHTS):
+    """
+    Returns the tiles of a list of boards as one array of planes,
+    each board encoded for the matching color in colors, or for
+    White if there are none.  The only Python loop is over the
+    tiles, each setting a single index into the array; the pinned
+    tiles are read from each board's cached articulation points.
+
+    Without a size, the window is WINDOW hexes across or as wide as
+    the widest hive needs.  Raises ValueError if a hive does not
+    fit in the size given, rather than leave tiles out.
+    """
+    widest = max([span(board) for board in boards] or [0])
+    if size is None:
+        size = max(WINDOW, 2 * widest + 1)
+    elif widest > (size - 1) // 2:
+        raise ValueError('A hive {0} hexes from its center does not fit '
+                         'a window {1} across'.format(widest, size))
+
+    planes = 16 * heights + 1
+    half = size // 2
+    out = np.zeros((len(boards), planes, size, size), np.uint8)
+
+    index = []
+    for b, board in enumerate(boards):
+        flip = 8 if colors is not None and colors[b] is Color.Black else 0
+        cq, cr = center(board)
+        components, articulation = board._hive_structure()
+        whole = components == 1 and len(board._pieces) > 1
+        for (q, r), stack in board._pieces.items():
+            x, y = q - cq + half, r - cr + half
+            for level, tile in enumerate(stack):
+                plane = min(level, heights - 1) * 16 + (tile.code ^ flip)
+                index.append(((b * planes + plane) * size + x) * size + y)
+
+            if whole:
+                pinned = len(stack) == 1 and (q, r) in articulation
+            else:
+                pinned = not board.one_hive_rule((q, r))
+            if pinned:
+                index.append(((b * planes + planes - 1) * size + x) * size + y)
+
+    np.put(out, index, 1)
+    return out
+
+def _neighbors(grid):
+    """
+    Stacks grid (boards, size, size) shifted by each offset of
+    RING, so [k] holds at every hex the value of its k-th neighbor.
+    """
+    size = grid.shape[-1]
+    padded = np.pad(grid, ((0,0), (1,1), (1,1)))
+    return np.stack([padded[:, 1 + dq:1 + dq + size, 1 + dr:1 + dr + size]
+                     for dq, dr in RING])
+
+def evaluate(planes):
+    """
+    Scores an encoded batch for the color each board was encoded
+    for, returning an int array with the same terms and weights as
+    engine.evaluate: ten a tile around the opposing Queen Bee, less
+    ten a tile around one's own, plus one a tile free to move, less
+    one for each of the opponent's.
+    """
+    heights = (planes.shape[1] - 1) // 16
+    occupied = planes[:, :16].any(axis=1)
+    own_top = planes[:, :8].any(axis=1)
+    for level in range(1, heights):
+        tiles = planes[:, level * 16:level * 16 + 16]
+        own_top = np.where(tiles.any(axis=1), tiles[:, :8].any(axis=1), own_top)
+
+    touching = _neighbors(occupied).sum(axis=0)
+    free = occupied & ~planes[:, PINNED].astype(bool)
+
+    own_surrounded = (planes[:, OWN_QUEEN] * touching).sum(axis=(1,2))
+    opp_surrounded = (planes[:, OPP_QUEEN] * touching).sum(axis=(1,2))
+    own_free = (free & own_top).sum(axis=(1,2))
+    opp_free = (free & ~own_top).sum(axis=(1,2))
+
+    return 10 * (opp_surrounded.astype(np.int64) - own_surrounded) + \
+           (own_free.astype(np.int64) - opp_free)
+
+def features(boards, colors, mobility=True):
+    """
+    Returns an int array with a row of HiveBoard.features for each
+    board and the matching color, its columns named by
+    HiveBoard.FEATURES.
+    """
+    return np.array([board.features(color, mobility)
+                     for board, color in zip(boards, colors)],
+                    dtype=np.int32).reshape(len(boards), len(HiveBoard.FEATURES))
+
+def score(boards, colors, size=None, heights=HEIGHTS):
+    """Encodes a list of boards for the matching colors and evaluates them"""
+    return evaluate(encode(boards, colors, size, heights))
@@ -0,0 +1,273 @@
+"""Benchmarks for move generation, validation and search on hive.HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from hive import HiveBoard, Color, Tile, Placement, Movement, IllegalMove
+from perft import perft
+
+#representative positions, each as (ply_number, arrangement); lists
+#are stacks, bottom first.  All arose in (seeded, random) legal games.
+CORPUS = {
+    'opening': (6, {
+        (-2, 0): 'bB', (-2, 1): 'bL', (-1, 0): 'bG',
+        (0, 0): 'wB', (1, -1): 'wQ', (2, -2): 'wL'
+    }),
+    'midgame_stacks': (30, {
+        (-5, 3): 'wL', (-4, 3): 'wS', (-3, 2): 'wS', (-2, 0): ['wQ', 'wB'],
+        (-2, 1): 'wP', (-1, 0): 'wG', (-1, 3): 'wA', (0, 0): ['wM', 'wB', 'bB'],
+        (0, 2): 'bM', (0, 3): 'bA', (0, 4): 'bG', (1, 0): 'bG',
+        (1, 1): 'bQ', (2, 0): 'bP'
+    }),
+    'expansion': (30, {
+        (-3, 3): 'bB', (-2, 2): 'bQ', (-2, 3): 'bL', (-1, 1): 'bP',
+        (0, -3): 'bM', (0, -2): 'bA', (0, -1): 'bA', (0, 0): ['wB', 'wB'],
+        (0, 1): 'wA', (1, 0): 'wM', (1, 1): 'wQ', (1, 2): 'wL',
+        (1, 3): 'bA', (2, -2): 'wS', (2, -1): 'wP', (3, -2): 'wG',
+        (3, -1): 'wS'
+    }),
+    'crowded_endgame': (46, {
+        (-3, -1): 'bA', (-2, -2): 'bA', (-2, -1): 'bG', (-2, 2): 'wA',
+        (-2, 3): 'wG', (-1, -3): 'bB', (-1, -2): 'bM', (-1, 1): 'wP',
+        (-1, 2): 'wA', (0, -3): 'bS', (0, -2): 'bL', (0, -1): 'bS',
+        (0, 0): ['wL', 'wB', 'wB'], (0, 1): 'wQ', (0, 2): 'wS', (1, -4): 'bP',
+        (1, -3): 'bQ', (1, 0): 'wS', (2, -4): 'wM', (2, -3): 'bA'
+    }),
+    'open_endgame': (36, {
+        (-4, 2): 'bG', (-4, 3): 'bG', (-3, 0): 'bS', (-3, 1): 'bG',
+        (-2, 0): 'bQ', (-2, 1): 'bL', (-2, 4): 'wG', (-1, -2): 'wA',
+        (-1, -1): 'bP', (-1, 0): 'bA', (-1, 1): 'bM', (-1, 2): 'wL',
+        (-1, 3): 'wM', (0, -3): 'bS', (0, 0): 'wP', (0, 1): 'wQ',
+        (1, -4): 'bA', (1, 0): 'wG', (1, 1): 'wB', (2, -1): 'wS',
+        (3, -1): 'wA'
+    })
+}
+
+def position(name):
+    """
+    Returns a new HiveBoard set up as CORPUS[name], and the color
+    to move.  The game log is padded so ply_number (and with it the
+    opening rules and the side to move) matches the position.
+    """
+    ply_number, arrangement = CORPUS[name]
+    board = HiveBoard()
+    board.quick_setup(arrangement)
+    board._log = [None] * ply_number
+    return (board, Color.Black if ply_number % 2 else Color.White)
+
+def _fresh(board):
+    """Forgets what is cached about the hive, as making a ply would"""
+    board._forget()
+
+#each benchmark sets up on a board and returns a function to time,
+#which returns the number of operations it performed
+
+def bench_valid_moves(board, color):
+    origins = [c for c, s in board._pieces.items() if s[-1].color is color]
+    def run():
+        for coords in origins:
+            _fresh(board)
+            list(board.valid_moves(coords))
+        return len(origins)
+    return run
+
+def bench_valid_placements(board, color):
+    def run():
+        list(board.valid_placements(color))
+        return 1
+    return run
+
+def _candidates(board, color):
+    """
+    Every legal ply, plus a placement and a movement from each of
+    color's tiles to every empty hex around the hive, most of them
+    illegal.
+    """
+    candidates = board.legal_plies(color)
+    empty = {c for coords in board._pieces
+               for c, t in board.neighbors(coords) if t is None}
+
+    for insect in board.available(color)[:1]:
+        candidates.extend(Placement(Tile(color, insect), dest) for dest in empty)
+    for coords, stack in board._pieces.items():
+        if stack[-1].color is color:
+            candidates.extend(Movement(coords, dest) for dest in empty)
+    return candidates
+
+def bench_validate(board, color):
+    candidates = _candidates(board, color)
+    def run():
+        for ply in candidates:
+            _fresh(board)
+            try:
+                board.validate(ply)
+            except IllegalMove:
+                pass
+        return len(candidates)
+    return run
+
+def bench_check(board, color):
+    candidates = _candidates(board, color)
+    def run():
+        for ply in candidates:
+            _fresh(board)
+            board.check(ply)
+        return len(candidates)
+    return run
+
+def bench_one_hive_rule(board, color):
+    occupied = list(board._pieces)
+    def run():
+        _fresh(board)
+        for coords in occupied:
+            board.one_hive_rule(coords)
+        return len(occupied)
+    return run
+
+def bench_free_pieces(board, color):
+    def run():
+        _fresh(board)
+        list(board.free_pieces(color))
+        return 1
+    return run
+
+def bench_features(board, color):
+    def run():
+        _fresh(board)
+        board.features(color)
+        return 1
+    return run
+
+def bench_legal_plies(board, color):
+    def run():
+        _fresh(board)
+        board.legal_plies(color)
+        return 1
+    return run
+
+def bench_perft(board, color):
+    return lambda: perft(board, 2, color)
+
+BENCHMARKS = [
+    ('valid_moves', bench_valid_moves),
+    ('valid_placements', bench_valid_placements),
+    ('validate', bench_validate),
+    ('check', bench_check),
+    ('one_hive_rule', bench_one_hive_rule),
+    ('free_pieces', bench_free_pieces),
+    ('features', bench_features),
+    ('legal_plies', bench_legal_plies),
+    ('perft(2)', bench_perft)
+]
+
+def measure(run, min_time=0.2):
+    """
+    Calls run until min_time has passed, returning (operations per
+    second, peak bytes allocated during a single call).
+    """
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ops, elapsed = 0, 0.0
+    started = time.perf_counter()
+    while elapsed < min_time:
+        ops += run()
+        elapsed = time.perf_counter() - started
+
+    return (ops / elapsed, peak)
+
+def run_all(names=None, benchmarks=None, min_time=0.2):
+    """
+    Measures every benchmark on every position in the corpus and
+    returns {position: {benchmark: {'ops': n, 'peak': bytes}}}.
+    """
+    results = {}
+    for name in names or sorted(CORPUS):
+        results[name] = {}
+        for label, fn in BENCHMARKS:
+            if benchmarks and label not in benchmarks:
+                continue
+            board, color = position(name)
+            ops, peak = measure(fn(board, color), min_time)
+            results[name][label] = {'ops': ops, 'peak': peak}
+    return results
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Returns a list of (position, benchmark, ratio) for every result
+    more than tolerance slower than the baseline.  A ratio is the
+    new speed over the old, so 0.8 means 20% slower.
+    """
+    regressions = []
+    for name, benches in sorted(results.items()):
+        for label, stats in sorted(benches.items()):
+            try:
+                ratio = stats['ops'] / baseline[name][label]['ops']
+            except (KeyError, ZeroDivisionError):
+                continue
+            if ratio < 1.0 - tolerance:
+                regressions.append((name, label, ratio))
+    return regressions
+
+def report(results, baseline=None):
+    lines = ['{0:<18}{1:<18}{2:>12}{3:>12}{4:>9}'.format(
+        'position', 'benchmark', 'ops/sec', 'peak KiB', 'vs base')]
+    for name, benches in sorted(results.items()):
+        for label, stats in benches.items():
+            ratio = ''
+            try:
+                ratio = '{0:.2f}x'.format(stats['ops'] / baseline[name][label]['ops'])
+            except (KeyError, TypeError, ZeroDivisionError):
+                pass
+            lines.append('{0:<18}{1:<18}{2:>12.1f}{3:>12.1f}{4:>9}'.format(
+                name, label, stats['ops'], stats['peak'] / 1024.0, ratio))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--position', action='append', choices=sorted(CORPUS),
+                        help='position(s) to run, default all')
+    parser.add_argument('--bench', action='append',
+                        choices=[label for label, fn in BENCHMARKS],
+                        help='benchmark(s) to run, default all')
+    parser.add_argument('--time', type=float, default=0.2,
+                        help='seconds to spend on each measurement')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown allowed before reporting a regression')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run_all(args.position, args.bench, args.time)
+    print(report(results, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, label, ratio in regressions:
+            print('REGRESSION {0} {1}: {2:.2f}x'.format(name, label, ratio))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,407 @@
+"""An alpha-beta search engine for Hive, built on hive.HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import os
+import time
+
+from hive import HiveBoard, Color, Rule, Pass
+
+WIN = 100000
+MATE = WIN - 1000 #scores beyond this are wins or losses a number of plies away
+
+#where evaluate finds what it weighs in HiveBoard.features()
+OWN_QUEEN_NEIGHBORS, OPP_QUEEN_NEIGHBORS, OWN_FREE, OPP_FREE = (
+    HiveBoard.FEATURES.index(name) for name in
+    ('own_queen_neighbors', 'opp_queen_neighbors', 'own_free', 'opp_free'))
+
+def evaluate(board, color):
+    """
+    A hand-crafted static evaluation of the position, from the
+    point of view of color: surrounding the opposing Queen Bee is
+    worth the most, followed by keeping tiles free to move.
+    """
+    f = board.features(color, mobility=False)
+
+    return 10 * (f[OPP_QUEEN_NEIGHBORS] - f[OWN_QUEEN_NEIGHBORS]) + \
+           (f[OWN_FREE] - f[OPP_FREE])
+
+def to_table(score, height):
+    """
+    Turns a score found height plies from the root into one for the
+    transposition table, where a win or loss counts its plies from
+    the position stored rather than from the root.
+    """
+    if score > MATE:
+        return score + height
+    elif score < -MATE:
+        return score - height
+    return score
+
+def from_table(score, height):
+    """Turns a score from the transposition table back; see to_table"""
+    if score > MATE:
+        return score - height
+    elif score < -MATE:
+        return score + height
+    return score
+
+def opponent(color):
+    """Returns the other color"""
+    return Color.Black if color is Color.White else Color.White
+
+def signature(ply):
+    """
+    Returns a hashable description of a ply, used to recognise the
+    same ply across separate calls to legal_plies.
+    """
+    return (ply.rule,
+            getattr(ply, 'origin', None),
+            ply.dest,
+            getattr(ply, 'actor_loc', None),
+            ply.tile.color if ply.tile else None,
+            ply.tile.insect if ply.tile else None)
+
+class SearchResult(object):
+    def __init__(self, ply, score, depth, nodes, elapsed):
+        self.ply = ply
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return 'depth {0} score {1} nodes {2} ({3:.0f} nps): {4}'.format(
+            self.depth, self.score, self.nodes, self.nps, self.ply)
+
+    @property
+    def nps(self):
+        """Nodes searched per second"""
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+class SearchAborted(Exception):
+    pass
+
+class Engine(object):
+    """
+    Iterative deepening negamax with alpha-beta pruning and a
+    transposition table.  The search makes and unmakes plies on the
+    board it is given rather than copying it, so the board is
+    returned to its original state when search() completes.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    BLACK_TO_SEARCH = 0x5D588B656C078965
+
+    def __init__(self,
+                 max_depth=4,
+                 time_limit=None,
+                 node_limit=None,
+                 table_size=2**16,
+                 evaluate=evaluate):
+        assert(table_size & (table_size - 1) == 0)
+
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.evaluate = evaluate
+        self.table = [None] * table_size
+        self.nodes = 0
+        self._deadline = None
+
+    def clear(self):
+        """Forgets all positions in the transposition table"""
+        self.table = [None] * len(self.table)
+
+    def search(self, board, color):
+        """
+        Searches the position for the given color, one depth at a
+        time up to max_depth or until the time or node budget runs
+        out, and returns a SearchResult for the deepest completed
+        iteration.  result.ply is None if color has no legal ply.
+        """
+        started = time.perf_counter()
+        self.nodes = 0
+        self._deadline = started + self.time_limit if self.time_limit else None
+
+        plies = self.order(board, color, board.legal_plies(color))
+        result = SearchResult(plies[0] if plies else None,
+                              self.evaluate(board, color), 0, 0, 0.0)
+        ply_number = board.ply_number
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, ply = self._root(board, color, depth, result.ply)
+            except SearchAborted:
+                while board.ply_number > ply_number:
+                    board.unmake()
+                break
+
+            result = SearchResult(ply, score, depth, self.nodes,
+                                  time.perf_counter() - started)
+            if ply is None or abs(score) >= WIN - self.max_depth:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def best_ply(self, board, color):
+        """Returns the ply search() prefers, or None"""
+        return self.search(board, color).ply
+
+    def _root(self, board, color, depth, previous_best):
+        plies = self.order(board, color, board.legal_plies(color),
+                           previous_best and signature(previous_best))
+        if not plies:
+            return (self.evaluate(board, color), None)
+
+        alpha, beta = -WIN - 1, WIN + 1
+        best = plies[0]
+
+        for ply in plies:
+            board.make(ply)
+            score = -self._negamax(board, opponent(color), depth - 1, -beta, -alpha, 1)
+            board.unmake()
+
+            if score > alpha:
+                alpha = score
+                best = ply
+
+        self._store(board, color, depth, alpha, self.EXACT, best)
+        return (alpha, best)
+
+    def _negamax(self, board, color, depth, alpha, beta, height):
+        self.nodes += 1
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchAborted
+        elif self._deadline and not self.nodes & 255 and \
+            time.perf_counter() >= self._deadline:
+            raise SearchAborted
+
+        winner = board.winner
+        if winner is not None:
+            if winner is False:
+                return 0
+            return WIN - height if winner is color else -WIN + height
+        elif depth <= 0:
+            return self.evaluate(board, color)
+
+        key = self._key(board, color)
+        entry = self.table[key & (len(self.table) - 1)]
+        hint = None
+
+        if entry is not None and entry[0] == key:
+            hint = entry[4]
+            if entry[1] >= depth:
+                score = from_table(entry[2], height)
+                if entry[3] == self.EXACT:
+                    return score
+                elif entry[3] == self.LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        plies = board.legal_plies(color)
+        if not plies:
+            #a player without any legal ply passes
+            board.make(Pass())
+            score = -self._negamax(board, opponent(color), depth - 1, -beta, -alpha, height + 1)
+            board.unmake()
+            return score
+
+        original_alpha = alpha
+        best_score, best = -WIN - 1, None
+
+        for ply in self.order(board, color, plies, hint):
+            board.make(ply)
+            score = -self._negamax(board, opponent(color), depth - 1, -beta, -alpha, height + 1)
+            board.unmake()
+
+            if score > best_score:
+                best_score, best = score, ply
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = self.UPPER
+        elif best_score >= beta:
+            flag = self.LOWER
+        else:
+            flag = self.EXACT
+
+        self._store(board, color, depth, best_score, flag, best, height)
+        return best_score
+
+    def order(self, board, color, plies, hint=None):
+        """
+        Sorts plies so the most promising are searched first: the
+        transposition table's best ply, then plies landing next to
+        the opposing Queen Bee, then other movements, then placements.
+        """
+        around_queen = set()
+        coords = board.queens[opponent(color)]
+        if coords is not None:
+            around_queen = board.hex_neighbors(board.tile_orientation, coords)
+
+        def priority(ply):
+            if hint and signature(ply) == hint:
+                return 0
+            elif ply.dest in around_queen:
+                return 1
+            elif ply.rule is not Rule.Place:
+                return 2
+            return 3
+
+        return sorted(plies, key=priority)
+
+    def _key(self, board, color):
+        if color is Color.Black:
+            return board.zobrist ^ self.BLACK_TO_SEARCH
+        return board.zobrist
+
+    def _store(self, board, color, depth, score, flag, ply, height=0):
+        key = self._key(board, color)
+        index = key & (len(self.table) - 1)
+        entry = self.table[index]
+
+        if entry is None or entry[0] != key or entry[1] <= depth:
+            self.table[index] = (key, depth, to_table(score, height), flag,
+                                 signature(ply) if ply else None)
+
+class ParallelEngine(Engine):
+    """
+    Splits the root of the search between worker processes: every
+    iteration the root plies are dealt out round-robin (best first)
+    and each worker searches its share with its own Engine, whose
+    transposition table persists for the life of the process.
+    The best score is the same as Engine.search finds, but the ply
+    may not be: scores below the best are only bounds, which depend
+    on what each worker's table holds.  Among plies with the same
+    score, the one searched first in the previous iteration's order
+    is chosen, however the plies were dealt out.
+    """
+    def __init__(self, workers=None, **kwargs):
+        super().__init__(**kwargs)
+        self.workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shuts down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def search(self, board, color):
+        started = time.perf_counter()
+        self.nodes = 0
+
+        plies = self.order(board, color, board.legal_plies(color))
+        result = SearchResult(plies[0] if plies else None,
+                              self.evaluate(board, color), 0, 0, 0.0)
+        if not plies:
+            return result
+
+        workers = min(self.workers or os.cpu_count() or 1, len(plies))
+
+        for depth in range(1, self.max_depth + 1):
+            remaining = None
+            if self.time_limit:
+                remaining = self.time_limit - (time.perf_counter() - started)
+                if remaining <= 0:
+                    break
+            node_limit = None
+            if self.node_limit:
+                node_limit = (self.node_limit - self.nodes) // workers
+                if node_limit <= 0:
+                    break
+
+            futures = [self.pool.submit(_search_root_plies, board, color,
+                                        plies[i::workers], depth,
+                                        remaining, node_limit,
+                                        len(self.table), self.evaluate)
+                       for i in range(workers)]
+
+            scored, completed = [], True
+            for f in futures:
+                scores, nodes = f.result()
+                self.nodes += nodes
+                if scores is None:
+                    completed = False
+                else:
+                    scored.extend(scores)
+
+            if not completed:
+                break
+
+            order = {signature(ply): i for i, ply in enumerate(plies)}
+            scored.sort(key=lambda s: (-s[0], order[signature(s[1])]))
+            plies = [ply for score, ply in scored]
+            result = SearchResult(plies[0], scored[0][0], depth, self.nodes,
+                                  time.perf_counter() - started)
+            if abs(result.score) >= WIN - self.max_depth:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - started
+        return result
+
+_worker_engines = {}
+
+def _search_root_plies(board, color, plies, depth, time_limit, node_limit,
+                       table_size, evaluate):
+    """
+    Runs in a worker process: searches each root ply to the given
+    depth and returns ([(score, ply), ...], nodes), or (None, nodes)
+    if the budget ran out first.  Scores below the best are only
+    upper bounds, which is all the root needs to choose a ply.
+    """
+    key = (table_size, evaluate)
+    if key not in _worker_engines:
+        _worker_engines[key] = Engine(table_size=table_size, evaluate=evaluate)
+    searcher = _worker_engines[key]
+
+    searcher.nodes = 0
+    searcher.node_limit = node_limit
+    searcher._deadline = time.perf_counter() + time_limit if time_limit else None
+
+    alpha, beta = -WIN - 1, WIN + 1
+    scores = []
+    ply_number = board.ply_number
+
+    try:
+        for ply in plies:
+            board.make(ply)
+            score = -searcher._negamax(board, opponent(color), depth - 1,
+                                       -beta, -alpha, 1)
+            board.unmake()
+
+            alpha = max(alpha, score)
+            scores.append((score, ply))
+    except SearchAborted:
+        while board.ply_number > ply_number:
+            board.unmake()
+        return (None, searcher.nodes)
+
+    return (scores, searcher.nodes)
@@ -8,6 +8,8 @@ __email__ = "wdchromium@gmail.com"
 
 from enum import Enum
 
+import traversal
+
 class Ply(object):
     def __init__(self, rule, tile):
         self.rule = rule
@@ -62,27 +64,55 @@ class Relocation(Ply):
         
         return retval
 
+class Pass(Ply):
+    """Stands for a turn where the player has nothing to do"""
+    def __init__(self):
+        super().__init__(Rule.Pass, None)
+        self.dest = None
+    
+    def __str__(self):
+        return 'Passing'
+
 class Tile(object):
-    def __init__(self, color, insect):
-        self._color = color
-        self._insect = insect
-        
+    """
+    A tile is just its color and insect, so there is only ever one
+    Tile for each of the 16 combinations: Tile(color, insect) hands
+    back the same (immutable) instance every time.  Tiles therefore
+    compare by identity and hash by their code, a small int with
+    the color in bit 3 and the insect in bits 0-2.
+    """
+    __slots__ = ('color', 'insect', 'code')
+    
+    _interned = {}
+    
+    def __new__(cls, color, insect):
+        try:
+            return cls._interned[(color, insect)]
+        except KeyError:
+            self = super().__new__(cls)
+            object.__setattr__(self, 'color', color)
+            object.__setattr__(self, 'insect', insect)
+            object.__setattr__(self, 'code',
+                               list(Color).index(color) << 3 | list(Insect).index(insect))
+            return cls._interned.setdefault((color, insect), self)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('Tiles are immutable')
+    
+    def __reduce__(self):
+        return (Tile, (self.color, self.insect))
+    
     def __eq__(self, other):
-        return self.color is other.color and self.insect is other.insect
+        return self is other
     
     def __ne__(self, other):
-        return not self.__eq__(other)
+        return self is not other
+    
+    def __hash__(self):
+        return self.code
     
     def __str__(self):
         return '{0} {1}'.format(self.color.name, self.insect.name)
-    
-    @property
-    def color(self):
-        return self._color
-        
-    @property
-    def insect(self):
-        return self._insect
 
 class Insect(Enum):
     Queen = 'Q'
@@ -120,6 +150,7 @@ class Rule(Enum):
     Relocate = 2
     Leech_Move = 3
     Leech_Relocate = 4
+    Pass = 5
     
 class Violation(Enum):
     Queen_Bee_Opening_Prohibited = 'Current rules disallow Queen Bee opening'
@@ -139,8 +170,38 @@ class Violation(Enum):
     Unavailable_Action = 'The active tile does not have access to this action'
     May_Not_Place_On_Other_Pieces = 'Pieces may not initially be placed on other pieces'
     Cannot_Jump_Gaps = 'Pieces may not temporarily be separated from the hive'
+    May_Not_Pass = 'A player may only pass with nothing else to do'
+    Not_In_Hand = 'The player has no such tile left to place'
+
+_ZOBRIST_KEYS = {}
+
+def zobrist_key(tile, coords, height):
+    """
+    Returns the 64-bit Zobrist key for a tile resting at the given
+    coordinates and stack height (0 being the table).  Keys are
+    derived from the arguments (splitmix64) rather than drawn at
+    random, so they agree between processes and runs.
+    """
+    k = (tile.code, coords, height)
+    try:
+        return _ZOBRIST_KEYS[k]
+    except KeyError:
+        packed = ((tile.code * 1024 + \
+                   (coords[0] & 1023)) * 1024 + \
+                   (coords[1] & 1023)) * 64 + height
+        _ZOBRIST_KEYS[k] = _splitmix64(packed)
+        return _ZOBRIST_KEYS[k]
+
+def _splitmix64(x):
+    mask = 0xFFFFFFFFFFFFFFFF
+    z = (x + 0x9E3779B97F4A7C15) & mask
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+    return z ^ (z >> 31)
 
 class HiveBoard(object):
+    ZOBRIST_BLACK_TO_MOVE = _splitmix64(0xB1ACC)
+    
     BLOCKING = {
         'FLAT': {
             Flat_Directions.N: (Flat_Directions.NW, Flat_Directions.NE),
@@ -159,14 +220,74 @@ class HiveBoard(object):
             Pointed_Directions.NW: (Pointed_Directions.NE, Pointed_Directions.W)
         }
     }
+    
+    #lookup tables derived from the above, so the hot paths below
+    #never scan an Enum or sum tuples to find a neighbor
+    OFFSETS = {
+        Flat_Directions: tuple(d.value for d in Flat_Directions),
+        Pointed_Directions: tuple(d.value for d in Pointed_Directions)
+    }
+    
+    DIRECTIONS = {
+        Flat_Directions: {d.value: d for d in Flat_Directions},
+        Pointed_Directions: {d.value: d for d in Pointed_Directions}
+    }
+    
+    GATES = {
+        Flat_Directions: {d.value: (a.value, b.value)
+                          for d, (a, b) in BLOCKING['FLAT'].items()},
+        Pointed_Directions: {d.value: (a.value, b.value)
+                             for d, (a, b) in BLOCKING['POINTED'].items()}
+    }
+        
+    BASE_HAND = {
+        Insect.Queen: 1,
+        Insect.Spider: 2,
+        Insect.Beetle: 2,
+        Insect.Grasshopper: 3,
+        Insect.Ant: 3
+    }
+    
+    EXPANSIONS = {
+        Insect.Mosquito: 1,
+        Insect.Ladybug: 1,
+        Insect.Pillbug: 1
+    }
+    
+    #the default: the base game with all three expansions
+    STARTING_HAND = dict(list(BASE_HAND.items()) + list(EXPANSIONS.items()))
+    
+    #what features() measures for each side, in the order it returns them
+    FEATURES = tuple(side + name for side in ('own_', 'opp_')
+                     for name in ('queen_placed', 'queen_neighbors', 'queen_liberties',
+                                  'in_hand', 'placements', 'free', 'pinned',
+                                  'covered', 'moves'))
         
     def __init__(self,
                  tile_orientation=Flat_Directions,
-                 queen_opening_allowed=False):
+                 queen_opening_allowed=False,
+                 starting_hand=None):
         self._pieces = {}
         self._log = []
+        self._hive = None
+        self._reach = {}
+        self._zobrist = 0
+        
+        #derived state, kept up to date by _push and _pop
+        self._queens = {Color.White: None, Color.Black: None}
+        self._counts = {(c, i): 0 for c in Color for i in Insect}
+        self._available = {c: None for c in Color} #insects in hand, when known
+        self._distances = {} #distance from (0,0) -> hexes occupied there
+        self._touching = {} #hex -> number of occupied neighbors
+        self._perimeter = set()
+        #color -> hex -> number of neighbors with that color on top
+        self._touching_by = {Color.White: {}, Color.Black: {}}
+        #color -> empty hexes touching that color and not the other
+        self._frontier = {Color.White: set(), Color.Black: set()}
         self.tile_orientation = tile_orientation
         self.queen_opening_allowed = queen_opening_allowed
+        self.starting_hand = dict(self.STARTING_HAND if starting_hand is None
+                                  else starting_hand)
 
     def __str__(self):
         """Produces an ASCII-based map of all the tiles"""
@@ -179,12 +300,21 @@ class HiveBoard(object):
         return str(hg)
         
     def quick_setup(self, arrangement):
-        """Provides an intuitive way to lay out tiles"""
-        for coord, piece in arrangement.items():
-            c = next(k for k in Color if k.value==piece[0])
-            i = next(k for k in Insect if k.value==piece[1])
-            
-            self.place(Tile(c,i), coord)
+        """
+        Provides an intuitive way to lay out tiles; a list of
+        pieces in place of one lays out a stack, bottom first
+        """
+        for coord, pieces in arrangement.items():
+            if isinstance(pieces, str):
+                pieces = [pieces]
+                
+            for piece in pieces:
+                t = Tile(Color(piece[0]), Insect(piece[1]))
+                
+                if coord in self._pieces:
+                    self._push(t, coord)
+                else:
+                    self.place(t, coord)
         
     def move(self, origin, dest):
         """
@@ -193,14 +323,8 @@ class HiveBoard(object):
         does not do any game-rule checking and assumes the move
         has already been properly validated
         """
-        t = self._pieces[origin].pop()
-        if not self._pieces[origin]:
-            del self._pieces[origin]
-
-        if dest in self._pieces:
-            self._pieces[dest].append(t)
-        else:
-            self._pieces[dest] = [t]
+        self._forget()
+        self._push(self._pop(origin), dest)
         
     def place(self, tile, coords):
         """
@@ -210,7 +334,142 @@ class HiveBoard(object):
         """
         if coords in self._pieces:
             raise IllegalMove(Violation.May_Not_Place_On_Other_Pieces)
-        self._pieces[coords] = [tile]
+        
+        self._forget()
+        self._push(tile, coords)
+        
+    def remove(self, coords):
+        """
+        Naively removes the top tile in a stack (or single)
+        and returns it.  Like move, no game-rule checking is done.
+        """
+        self._forget()
+        return self._pop(coords)
+        
+    def _push(self, tile, coords):
+        """
+        Puts a tile on top of whatever is at coords, updating the
+        hash and all derived state.  Every change to the board
+        goes through this and _pop.
+        """
+        stack = self._pieces.get(coords)
+        if stack is None:
+            stack = self._pieces[coords] = []
+            self._occupy(coords)
+            self._frontier[Color.White].discard(coords)
+            self._frontier[Color.Black].discard(coords)
+            below = None
+        else:
+            below = stack[-1].color
+        
+        self._zobrist ^= zobrist_key(tile, coords, len(stack))
+        stack.append(tile)
+        if below is not tile.color:
+            self._recolor(coords, below, tile.color)
+        
+        count = self._counts[(tile.color, tile.insect)] = \
+            self._counts[(tile.color, tile.insect)] + 1
+        if count >= self.starting_hand.get(tile.insect, 0):
+            self._available[tile.color] = None
+        if tile.insect is Insect.Queen:
+            self._queens[tile.color] = coords
+            
+    def _pop(self, coords):
+        """Takes the top tile off coords; the reverse of _push"""
+        stack = self._pieces[coords]
+        tile = stack.pop()
+        self._zobrist ^= zobrist_key(tile, coords, len(stack))
+        
+        if stack:
+            if stack[-1].color is not tile.color:
+                self._recolor(coords, tile.color, stack[-1].color)
+        else:
+            del self._pieces[coords]
+            self._vacate(coords)
+            self._recolor(coords, tile.color, None)
+            self._refront(coords)
+        
+        count = self._counts[(tile.color, tile.insect)] = \
+            self._counts[(tile.color, tile.insect)] - 1
+        if count >= self.starting_hand.get(tile.insect, 0) - 1:
+            self._available[tile.color] = None
+        if tile.insect is Insect.Queen:
+            self._queens[tile.color] = None
+        
+        return tile
+    
+    def _occupy(self, coords):
+        """Records a hex becoming occupied in the radius and perimeter"""
+        d = self.hex_distance((0,0), coords)
+        self._distances[d] = self._distances.get(d, 0) + 1
+        
+        q, r = coords
+        touching, perimeter = self._touching, self._perimeter
+        perimeter.discard(coords)
+        for dq, dr in self.OFFSETS[self.tile_orientation]:
+            n = (q + dq, r + dr)
+            touching[n] = touching.get(n, 0) + 1
+            if n not in self._pieces:
+                perimeter.add(n)
+    
+    def _vacate(self, coords):
+        """Records a hex becoming empty in the radius and perimeter"""
+        d = self.hex_distance((0,0), coords)
+        self._distances[d] -= 1
+        if not self._distances[d]:
+            del self._distances[d]
+        
+        q, r = coords
+        touching, perimeter = self._touching, self._perimeter
+        for dq, dr in self.OFFSETS[self.tile_orientation]:
+            n = (q + dq, r + dr)
+            touching[n] -= 1
+            if not touching[n]:
+                del touching[n]
+                perimeter.discard(n)
+        if coords in touching:
+            perimeter.add(coords)
+    
+    def _recolor(self, coords, old, new):
+        """
+        Records the color on top of coords changing from old to new
+        (None for empty) in the per-color touch counts, and so in
+        the placement frontier of each color.
+        """
+        q, r = coords
+        pieces = self._pieces
+        old_touching = self._touching_by[old] if old else None
+        new_touching = self._touching_by[new] if new else None
+        
+        for dq, dr in self.OFFSETS[self.tile_orientation]:
+            n = (q + dq, r + dr)
+            if old_touching is not None:
+                old_touching[n] -= 1
+                if not old_touching[n]:
+                    del old_touching[n]
+            if new_touching is not None:
+                new_touching[n] = new_touching.get(n, 0) + 1
+            if n not in pieces:
+                self._refront(n)
+    
+    def _refront(self, coords):
+        """Puts an empty hex in the frontier of the one color it touches, if any"""
+        white = coords in self._touching_by[Color.White]
+        black = coords in self._touching_by[Color.Black]
+        
+        if white and not black:
+            self._frontier[Color.White].add(coords)
+        else:
+            self._frontier[Color.White].discard(coords)
+        if black and not white:
+            self._frontier[Color.Black].add(coords)
+        else:
+            self._frontier[Color.Black].discard(coords)
+        
+    def _forget(self):
+        """Drops everything cached about the shape of the hive"""
+        self._hive = None
+        self._reach = {}
         
     def piece_at(self, coords):
         """Returns the tile (or topmost tile) at a given coordinate"""
@@ -230,19 +489,75 @@ class HiveBoard(object):
         """
         assert(ply.rule in Rule)
         
-        try:
-            ply = self.validate(ply)
-            assert(ply)
-        except IllegalMove:
-            raise
-        else:
-            if ply.rule == Rule.Place:
-                self.place(ply.tile, ply.dest)
-            elif ply.rule in {Rule.Move, Rule.Leech_Move,
-                              Rule.Relocate, Rule.Leech_Relocate}:
-                self.move(ply.origin, ply.dest)
+        verdict = self.check(ply)
+        if verdict.violation is not None:
+            raise IllegalMove(verdict.violation)
+        self.make(verdict.ply)
     
-            self._log.append(ply)
+    def make(self, ply):
+        """
+        Completes a ply with the inner functions and adds it to the
+        game log, without checking it against any rules.  Intended
+        for plies already known to be legal, e.g. from legal_plies.
+        """
+        if ply.rule == Rule.Place:
+            self.place(ply.tile, ply.dest)
+        elif ply.rule in {Rule.Move, Rule.Leech_Move,
+                          Rule.Relocate, Rule.Leech_Relocate}:
+            self.move(ply.origin, ply.dest)
+
+        self._log.append(ply)
+    
+    def unmake(self):
+        """
+        Takes back the last ply in the game log, restoring the
+        board exactly as it was (including the order of stacks),
+        and returns the ply.  Raises IndexError if the log is empty.
+        """
+        ply = self._log.pop()
+        
+        if ply.rule == Rule.Place:
+            self.remove(ply.dest)
+        elif ply.rule in {Rule.Move, Rule.Leech_Move,
+                          Rule.Relocate, Rule.Leech_Relocate}:
+            self.move(ply.dest, ply.origin)
+        
+        return ply
+    
+    undo = unmake
+    
+    def save_log(self, f):
+        """
+        Writes the game log to the binary file f in the compact
+        format of the record module, a few bytes per ply.
+        """
+        import record
+        
+        record.write_game(f, self)
+    
+    def load_log(self, f):
+        """
+        Reads the next game saved with save_log from the binary file
+        f and plays it onto this board, which must be empty; the
+        board takes on the recorded tile orientation, opening rule
+        and starting hand.  Returns the number of plies played.
+        """
+        import record
+        
+        if self._pieces or self._log:
+            raise ValueError('A game log can only be loaded onto an empty board')
+        
+        game = record.read_game(f)
+        if game is None:
+            raise EOFError('No game left to load')
+        
+        self.tile_orientation = game.tile_orientation
+        self.queen_opening_allowed = game.queen_opening_allowed
+        self.starting_hand = game.starting_hand
+        self._available = {c: None for c in Color}
+        for ply in game.plies():
+            self.make(ply)
+        return game.ply_count
     
     def validate(self, ply):
         """
@@ -251,20 +566,27 @@ class HiveBoard(object):
         If all is well, it will return a (possibly) new ply,
         but with the .tile attribute properly populated.
         """
-        def queen_placed(color):
-            """Checks if queen is placed for the current color."""
-            q = Tile(color, Insect.Queen)
-            for stack in self._pieces.values():
-                if q in stack:
-                    return True
-            return False
-            
+        verdict = self.check(ply)
+        if verdict.violation is not None:
+            raise IllegalMove(verdict.violation)
+        return verdict.ply
+    
+    def check(self, ply):
+        """
+        Tests a ply against all the rules validate does, but
+        rather than raising IllegalMove returns a Verdict: the ply
+        (with the .tile attribute populated) and the Violation it
+        commits, or None.  Meant for search and analysis, which
+        reject far more plies than they accept.
+        """
+        return Verdict(ply, self._violation(ply))
+    
+    def _violation(self, ply):
+        """Returns the Violation ply commits, or None if it is legal"""
         def placed_adjacent_to_opponent(color):
             """Checks if tile is ilegally placed next to opponent"""
-            for c,t in self.neighbors(ply.dest):
-                if t and t.color is not color:
-                    return True
-            return False
+            other = Color.Black if color is Color.White else Color.White
+            return ply.dest in self._touching_by[other]
             
         def check_queen_opening():
             """
@@ -274,7 +596,7 @@ class HiveBoard(object):
             if self.ply_number in {0,1} and \
                 not self.queen_opening_allowed and \
                 ply.tile.insect is Insect.Queen:
-                raise IllegalMove(Violation.Queen_Bee_Opening_Prohibited)
+                return Violation.Queen_Bee_Opening_Prohibited
             
         def check_queen_down_by_fourth_turn():
             """
@@ -282,10 +604,158 @@ class HiveBoard(object):
             force the player's 4th ply to be a Queen.
             """
             if self.ply_number in {6,7} and \
-                not queen_placed(ply.tile.color) and \
+                not self.queen_placed(ply.tile.color) and \
                 ply.tile.insect is not Insect.Queen:
-                raise IllegalMove(Violation.Queen_Bee_Must_Be_Played)
+                return Violation.Queen_Bee_Must_Be_Played
+            
+        def check_origin_dest_empty_adjacency(pillbug_coords):
+            """
+            Checks that a pillbugs relocation move is:
+            a) adjacent to the pillbug itself and
+            b) not originating or ending on a stack
+            """
+            neighbors = self.hex_neighbors(self.tile_orientation, pillbug_coords)
+            if ply.origin not in neighbors or \
+                ply.dest not in neighbors:
+                return Violation.Pillbug_Adjacent
+            elif ply.dest in self._pieces or \
+                len(self.stack_at(ply.origin)) > 1:
+                return Violation.Pillbug_Cannot_Touch_Stacks
+
+        if ply.rule == Rule.Place:
+            assert(isinstance(ply.tile, Tile))
+            assert(isinstance(ply.dest, tuple))
+            
+            if ply.tile.insect not in self.available(ply.tile.color):
+                return Violation.Not_In_Hand
+            
+            violation = check_queen_opening() or check_queen_down_by_fourth_turn()
+            if violation:
+                return violation
+            
+            if self.ply_number == 0:
+                return None
+            elif self.ply_number == 1:
+                if not placed_adjacent_to_opponent(ply.tile.color):
+                    return Violation.Must_Place_Adjacent
+            else:
+                if placed_adjacent_to_opponent(ply.tile.color):
+                    return Violation.May_Not_Place_Adjacent
+                elif ply.dest not in self._touching:
+                    return Violation.One_Hive_Rule
+        elif ply.rule == Rule.Move:
+            assert(isinstance(ply.origin, tuple))
+            assert(isinstance(ply.dest, tuple))
+            
+            ply.tile = self.piece_at(ply.origin)
+
+            if not self.queen_placed(ply.tile.color):
+                return Violation.No_Movement_Before_Queen_Bee_Placed
+            if not self.one_hive_rule(ply.origin):
+                return Violation.One_Hive_Rule
+                
+            return self._movement_violation(ply)
+        elif ply.rule == Rule.Relocate:
+            assert(isinstance(ply.origin, tuple))
+            assert(isinstance(ply.dest, tuple))
+            assert(isinstance(ply.actor_loc, tuple) and ply.actor_loc)
+            
+            ply.tile = self.piece_at(ply.actor_loc)
+            
+            if self.piece_at(ply.actor_loc).insect != Insect.Pillbug:
+                return Violation.Unavailable_Action
+
+            violation = check_origin_dest_empty_adjacency(ply.actor_loc)
+            if violation:
+                return violation
+            
+            if not self.one_hive_rule(ply.origin):
+                return Violation.One_Hive_Rule
+        elif ply.rule == Rule.Leech_Relocate:
+            assert(isinstance(ply.origin, tuple))
+            assert(isinstance(ply.dest, tuple))
+            assert(isinstance(ply.actor_loc, tuple) and ply.actor_loc)
+            assert(isinstance(ply.leech_from, tuple) and ply.leech_from)
+            
+            ply.tile = self.piece_at(ply.actor_loc)
+            
+            if self.piece_at(ply.leech_from).insect != Insect.Pillbug:
+                return Violation.Unavailable_Action
+            elif ply.leech_from not in self.hex_neighbors(self.tile_orientation, ply.actor_loc):
+                return Violation.Mosquito_Adjacent
             
+            return check_origin_dest_empty_adjacency(ply.actor_loc)
+        elif ply.rule == Rule.Leech_Move:
+            return self._leech_violation(ply)
+        elif ply.rule == Rule.Pass:
+            color = Color.Black if self.ply_number % 2 else Color.White
+            if self.legal_plies(color):
+                return Violation.May_Not_Pass
+        else:
+            raise RuntimeError
+        
+        return None
+        
+    def validate_many(self, plies):
+        """
+        Tests a batch of plies against the current position, as
+        check does, but returns a list holding for each ply either
+        the validated ply or the Violation it commits.
+        
+        What the plies have in common is worked out once for the
+        batch: the One Hive structure and the flood of each ant with
+        several plies are cached on the board until it next changes,
+        and each leeched power's moves are found once.
+        """
+        results = []
+        leeched = {}
+        
+        ants = {}
+        for ply in plies:
+            if ply.rule == Rule.Move and ply.origin in self._pieces and \
+                self.piece_at(ply.origin).insect is Insect.Ant:
+                ants[ply.origin] = ants.get(ply.origin, 0) + 1
+        for origin, count in ants.items():
+            if count > 1 and self.one_hive_rule(origin) and \
+                self.queen_placed(self.piece_at(origin).color):
+                self.reachable(origin)
+        
+        for ply in plies:
+            if ply.rule == Rule.Leech_Move:
+                key = (ply.origin, self.piece_at(ply.leech_from).insect)
+                if key not in leeched:
+                    leeched[key] = set(self.valid_moves(*key))
+                results.append(self._leech_violation(ply, leeched[key]) or ply)
+            else:
+                results.append(self._violation(ply) or ply)
+        
+        return results
+    
+    def _leech_violation(self, ply, moves=None):
+        """
+        The rules for a Leech_Move, which also sets its tile: it must
+        land where the leeched insect could move from its origin.
+        moves, if given, is the set of valid_moves already found for
+        that insect.  Returns the Violation, or None.
+        """
+        assert(isinstance(ply.origin, tuple))
+        assert(isinstance(ply.dest, tuple))
+        assert(isinstance(ply.leech_from, tuple) and ply.leech_from)
+        
+        ply.tile = self.piece_at(ply.origin)
+        
+        if moves is None:
+            moves = set(self.valid_moves(ply.origin, self.piece_at(ply.leech_from).insect))
+        if ply.dest not in moves:
+            return Violation.Unavailable_Action
+        return None
+        
+    def _movement_violation(self, ply):
+        """
+        The portion of the rules concerned with where a moving tile
+        may go, once the position-wide requirements (Queen Bee placed,
+        One Hive) have been met.  Returns the Violation, or None.
+        """
         def check_climbing_permitted():
             """
             If the destination of a piece is atop another piece,
@@ -293,7 +763,7 @@ class HiveBoard(object):
             """
             if ply.dest in self._pieces and \
                 ply.tile.insect is not Insect.Beetle:
-                raise IllegalMove(Violation.Insect_Cannot_Climb)
+                return Violation.Insect_Cannot_Climb
         
         def check_correct_distance_for_single_hex_insects():
             """Ensure that pieces that may move only one hex do so"""
@@ -301,21 +771,21 @@ class HiveBoard(object):
                                    Insect.Beetle,
                                    Insect.Pillbug} and \
                 self.hex_distance(ply.origin, ply.dest) != 1:
-                raise IllegalMove(Violation.Distance_Must_Be_Exactly_One)
+                return Violation.Distance_Must_Be_Exactly_One
         
         def check_correct_distance_for_spiders(start, end):
             """
-            Ensure spiders never land farther than 3 spaces
-            away from their starting position
+            Ensure spiders land at the end of exactly 3 slides,
+            never revisiting a hex
             """
             if ply.tile.insect == Insect.Spider and \
-                self.hex_distance(start, end) > 3:
-                raise IllegalMove(Violation.Invalid_Distance_Attempted)
+                end not in self.slide_paths(start, 3):
+                return Violation.Invalid_Distance_Attempted
 
         def check_insect_moved():
             """Ensure no tile ends up where it started"""
             if ply.origin == ply.dest:
-                raise IllegalMove(Violation.Did_Not_Move)
+                return Violation.Did_Not_Move
                 
         def check_not_isolated():
             """
@@ -334,29 +804,23 @@ class HiveBoard(object):
             
             if not any(t for c,t in neighbors.items()) and \
                 origin_will_be_vacated:
-                raise IllegalMove(Violation.One_Hive_Rule)      
+                return Violation.One_Hive_Rule
                 
         def freedom_of_movement(path):
             """
             Checks that a piece can physically slide into
             a position each step of the way.
             """
+            if path is None:
+                return Violation.Freedom_of_Movement
             if self.piece_at(path[0]).insect in {Insect.Grasshopper, Insect.Beetle}:
                 return
 
-            path_copy = path[:]
-            blockers = self.BLOCKING['FLAT'] if self.tile_orientation == Flat_Directions else self.BLOCKING['POINTED']
-            
-            while path_copy:
-                try:
-                    current = path_copy.pop(0)
-                    direction = self.get_direction(current, path_copy[0], self.tile_orientation)
-                    
-                    if self.go_direction(current, blockers[direction][0]) in self._pieces and \
-                        self.go_direction(current, blockers[direction][1]) in self._pieces:
-                        raise IllegalMove(Violation.Freedom_of_Movement)
-                except IndexError:
-                    break
+            for current, following in zip(path, path[1:]):
+                gate_1, gate_2 = self._gates(current, following)
+                
+                if gate_1 in self._pieces and gate_2 in self._pieces:
+                    return Violation.Freedom_of_Movement
         
         def beetle_gate_freedom_of_movement(start, end):
             '''
@@ -375,29 +839,11 @@ class HiveBoard(object):
             if self.piece_at(start).insect is not Insect.Beetle:
                 return
                 
-            blockers = self.BLOCKING['FLAT'] if self.tile_orientation == Flat_Directions else self.BLOCKING['POINTED']
-            direction = self.get_direction(start, end, self.tile_orientation)
-            
-            gate_1 = self.go_direction(start, blockers[direction][0])
-            gate_2 = self.go_direction(start, blockers[direction][1])
+            gate_1, gate_2 = self._gates(start, end)
 
             if min(height_of(gate_1), height_of(gate_2)) > max(height_of(start)-1, height_of(end)):
-                raise IllegalMove(Violation.Freedom_of_Movement)
+                return Violation.Freedom_of_Movement
         
-        def check_origin_dest_empty_adjacency(pillbug_coords):
-            """
-            Checks that a pillbugs relocation move is:
-            a) adjacent to the pillbug itself and
-            b) not originating or ending on a stack
-            """
-            neighbors = self.hex_neighbors(self.tile_orientation, pillbug_coords)
-            if ply.origin not in neighbors or \
-                ply.dest not in neighbors:
-                raise IllegalMove(Violation.Pillbug_Adjacent)
-            elif ply.dest in self._pieces or \
-                len(self.stack_at(ply.origin)) > 1:
-                raise IllegalMove(Violation.Pillbug_Cannot_Touch_Stacks)
-                
         def jumping_gap(start, end):
             """
             Checks that even in transit, a piece is always
@@ -410,101 +856,19 @@ class HiveBoard(object):
             elif len(self.stack_at(start)) > 1:
                 return #if climbing down, gap irrelevant
                 
-            direction = self.get_direction(start, end, self.tile_orientation)            
-            helpers = self.BLOCKING['FLAT'] if self.tile_orientation == Flat_Directions else self.BLOCKING['POINTED']
-            if self.go_direction(start, helpers[direction][0]) not in self._pieces and \
-               self.go_direction(start, helpers[direction][1]) not in self._pieces:
-                raise IllegalMove(Violation.Cannot_Jump_Gaps)
-
-        if ply.rule == Rule.Place:
-            assert(isinstance(ply.tile, Tile))
-            assert(isinstance(ply.dest, tuple))
-            
-            check_queen_opening()
-            check_queen_down_by_fourth_turn()
-            
-            if self.ply_number == 0:
-                return ply
-            elif self.ply_number == 1:
-                if placed_adjacent_to_opponent(ply.tile.color):
-                    return ply
-                else:
-                    raise IllegalMove(Violation.Must_Place_Adjacent)
-            else:
-                if placed_adjacent_to_opponent(ply.tile.color):
-                    raise IllegalMove(Violation.May_Not_Place_Adjacent)
-                elif not any(c in self._pieces for c in self.hex_neighbors(self.tile_orientation, ply.dest)):
-                    raise IllegalMove(Violation.One_Hive_Rule)
-                else:
-                    return ply
-        elif ply.rule == Rule.Move:
-            assert(isinstance(ply.origin, tuple))
-            assert(isinstance(ply.dest, tuple))
-            
-            ply.tile = self.piece_at(ply.origin)
+            helper_1, helper_2 = self._gates(start, end)
+            if helper_1 not in self._pieces and helper_2 not in self._pieces:
+                return Violation.Cannot_Jump_Gaps
 
-            if not queen_placed(ply.tile.color):
-                raise IllegalMove(Violation.No_Movement_Before_Queen_Bee_Placed)
-            if not self.one_hive_rule(ply.origin):
-                raise IllegalMove(Violation.One_Hive_Rule)
-                
-            check_not_isolated()
-            
-            check_insect_moved()
-            check_climbing_permitted()
-            check_correct_distance_for_single_hex_insects()
-            check_correct_distance_for_spiders(ply.origin, ply.dest)
-            
-            freedom_of_movement(self.valid_path(ply.origin, ply.dest))
-            beetle_gate_freedom_of_movement(ply.origin, ply.dest)
-            
+        return check_not_isolated() or \
+            check_insect_moved() or \
+            check_climbing_permitted() or \
+            check_correct_distance_for_single_hex_insects() or \
+            check_correct_distance_for_spiders(ply.origin, ply.dest) or \
+            freedom_of_movement(self._path(ply.origin, ply.dest)) or \
+            beetle_gate_freedom_of_movement(ply.origin, ply.dest) or \
             jumping_gap(ply.origin, ply.dest)
 
-            return ply
-        elif ply.rule == Rule.Relocate:
-            assert(isinstance(ply.origin, tuple))
-            assert(isinstance(ply.dest, tuple))
-            assert(isinstance(ply.actor_loc, tuple) and ply.actor_loc)
-            
-            ply.tile = self.piece_at(ply.actor_loc)
-            
-            if self.piece_at(ply.actor_loc).insect != Insect.Pillbug:
-                raise IllegalMove(Violation.Unavailable_Action)
-
-            check_origin_dest_empty_adjacency(ply.actor_loc)
-            
-            if not self.one_hive_rule(ply.origin):
-                raise IllegalMove(Violation.One_Hive_Rule)
-            
-            return ply
-        elif ply.rule == Rule.Leech_Relocate:
-            assert(isinstance(ply.origin, tuple))
-            assert(isinstance(ply.dest, tuple))
-            assert(isinstance(ply.actor_loc, tuple) and ply.actor_loc)
-            assert(isinstance(ply.leech_from, tuple) and ply.leech_from)
-            
-            ply.tile = self.piece_at(ply.actor_loc)
-            
-            if self.piece_at(ply.leech_from).insect != Insect.Pillbug:
-                raise IllegalMove(Violation.Unavailable_Action)
-            elif ply.leech_from not in self.hex_neighbors(self.tile_orientation, ply.actor_loc):
-                raise IllegalMove(Violation.Mosquito_Adjacent)
-            
-            check_origin_dest_empty_adjacency(ply.actor_loc)
-            
-            return ply
-        elif ply.rule == Rule.Leech_Move:
-            assert(isinstance(ply.origin, tuple))
-            assert(isinstance(ply.dest, tuple))
-            assert(isinstance(ply.leech_from, tuple) and ply.leech_from)
-            
-            if ply.dest in set(self.valid_moves(ply.origin, self.piece_at(ply.leech_from).insect)):
-                return ply
-            #else:
-            #    raise IllegalMove(Violation.Unavailable_Action)
-        else:
-            raise RuntimeError
-        
     def valid_moves(self, coords, acting_as=None):
         """Return a generator containing all the hexes
         which a tile could move to in one turn. This funciton,
@@ -516,23 +880,26 @@ class HiveBoard(object):
         all potential moves. This way, validation can occur at
         execution of the ply, rather than prior to execution.
         """
+        offsets = self.OFFSETS[self.tile_orientation]
+        
         def adjacent_to_something(ignored_origin, dest):
             """Check destination has another tile adjacent"""
-            for c,t in self.neighbors(dest):
-                if t and c != ignored_origin:
+            for dq, dr in offsets:
+                c = (dest[0] + dq, dest[1] + dr)
+                if c in self._pieces and c != ignored_origin:
                     return True
                         
         def queen_bee():
             """Check destination is empty and adjacent"""
-            for direction in self.tile_orientation:
-                c = self.go_direction(coords, direction)
+            for dq, dr in offsets:
+                c = (coords[0] + dq, coords[1] + dr)
                 if c not in self._pieces and adjacent_to_something(coords, c):
                     yield c
         
         def beetle():
             """Check destination is adjacent"""
-            for direction in self.tile_orientation:
-                c = self.go_direction(coords, direction)
+            for dq, dr in offsets:
+                c = (coords[0] + dq, coords[1] + dr)
                 if adjacent_to_something(coords, c):
                     yield c
                     
@@ -541,55 +908,29 @@ class HiveBoard(object):
             Check destination is a straight line over
             at least one tile
             """
-            for direction in self.tile_orientation:
-                c = self.go_direction(coords, direction)
+            for dq, dr in offsets:
+                c = (coords[0] + dq, coords[1] + dr)
                 if c in self._pieces:
                     while c in self._pieces:
-                        c = self.go_direction(c, direction)
+                        c = (c[0] + dq, c[1] + dr)
                     yield c
         
         def ant():
             """
-            Returns roughly all tiles around perimeter.
-            Note, some may be FOM-violating
+            Returns every empty hex around the hive the tile can
+            slide to, in a single flood outward from coords.
             """
-            valid = set()
-
-            for p in {k for k in self._pieces.keys() if k != coords}:
-                valid.update(self.hex_neighbors(self.tile_orientation, p))
-
-            valid.difference_update({k for k in self._pieces.keys()})
-            for i in valid:
-                yield i
+            for c in self.reachable(coords):
+                if c not in self._pieces and adjacent_to_something(coords, c):
+                    yield c
         
         def spider():
             """
-            Check destination is truly 3 hexes worth of movement,
-            but does not ever revisit a hex.
+            Check destination is the end of exactly 3 slides,
+            never revisiting a hex.
             """
-            checked = set()
-            s1 = set() #1 tile out
-            s2 = set() #2 tiles out
-            s3 = set() #3 tiles out
-
-            for c,t in self.neighbors(coords):
-                if not t and adjacent_to_something(coords, c):
-                    s1.add(c)
-                    checked.add(c)
-
-            for i in s1:
-                for c,t in self.neighbors(i):
-                    if not t and adjacent_to_something(coords, c) and c not in checked:
-                        s2.add(c)
-                        checked.add(c)
-            
-            for i in s2:
-                for c,t in self.neighbors(i):
-                    if not t and adjacent_to_something(coords, c) and c not in checked:
-                        s3.add(c)
-
-            for i in s3:
-                yield i
+            for c in self.slide_paths(coords, 3):
+                yield c
                 
         def ladybug():
             """
@@ -676,96 +1017,208 @@ class HiveBoard(object):
         thanks amit patel
         http://www.redblobgames.com/pathfinding/a-star/introduction.html
         '''
-        def freedom_of_movement_violated(start, end):
-            blockers = self.BLOCKING['FLAT'] if self.tile_orientation == Flat_Directions else self.BLOCKING['POINTED']
-            direction = self.get_direction(start, end, self.tile_orientation)
-            
-            if self.go_direction(start, blockers[direction][0]) in self._pieces and \
-                self.go_direction(start, blockers[direction][1]) in self._pieces:
-                return True
-
-        from queue import Queue
+        path = self._path(origin, dest)
+        if path is None:
+            raise IllegalMove(Violation.Freedom_of_Movement)
+        return path
         
-        frontier = Queue()
-        frontier.put(origin)
+    def _path(self, origin, dest):
+        """As valid_path, but returns None if there is no path"""
+        insect = self.piece_at(origin).insect
         
-        came_from = {}
-        came_from[origin] = None
+        def beetle(current):
+            return self.hex_neighbors(self.tile_orientation, current)
         
-        limit = ((self.radius + 1)*2) * 6
-        #includes radius, plus one padding for the boundaries
-        #multiplies by two, for the diameter
-        #multiplied by six, for how many new hexagons introduced per radius
-        counter = 0
+        def grasshopper(current):
+            for n in self.hex_neighbors(self.tile_orientation, current):
+                if n == dest:
+                    if n not in self._pieces:
+                        yield n
+                elif n in self._pieces:
+                    yield n
         
-        insect = self.piece_at(origin).insect
-
-        while not frontier.empty():
-            counter += 1
-            if counter > limit: break
-            current = frontier.get()
-            
-            if current not in self._pieces and \
-                not any(c in self._pieces for c in self.hex_neighbors(self.tile_orientation, current)):
-                continue
-            
+        def ladybug(current):
             for n in self.hex_neighbors(self.tile_orientation, current):
-                if n not in came_from:
-                    if insect in {Insect.Spider, Insect.Ant, Insect.Queen, Insect.Pillbug}:                        
-                        if n not in self._pieces and \
-                            not freedom_of_movement_violated(current, n):
-                            frontier.put(n)
-                            came_from[n] = current
-                    elif insect is Insect.Beetle:
-                        frontier.put(n)
-                        came_from[n] = current
-                    elif insect is Insect.Grasshopper:
-                        if n in self._pieces and n!= dest:
-                            frontier.put(n)
-                            came_from[n] = current
-                        elif n not in self._pieces and n == dest:
-                            frontier.put(n)
-                            came_from[n] = current
-                    elif insect is Insect.Ladybug:
-                        if n == dest:
-                            frontier.put(n)
-                            came_from[n] = current
-                        elif n in self._pieces:
-                            frontier.put(n)
-                            came_from[n] = current
-
-        current = dest
-        path = [current]
+                if n == dest or n in self._pieces:
+                    yield n
         
-        try:
-            came_from[current]
-        except KeyError:
-            raise IllegalMove(Violation.Freedom_of_Movement)
+        def touching_hive(step):
+            """Only goes on from hexes which are part of or touch the hive"""
+            def retval(current):
+                if current in self._pieces or current in self.perimeter:
+                    return step(current)
+                return ()
+            return retval
         
-        while current != origin:
-            current = came_from[current]
-            path.append(current)
-        return list(reversed(path))
+        if insect in {Insect.Spider, Insect.Ant, Insect.Queen, Insect.Pillbug}:
+            came_from = self._reach.get(origin)
+            if came_from is None:
+                #without a flood to hand, stop as soon as dest is found
+                came_from = traversal.slide(origin, self._pieces,
+                                            self.OFFSETS[self.tile_orientation],
+                                            self.GATES[self.tile_orientation],
+                                            self.perimeter, dest)
+        elif insect in {Insect.Beetle, Insect.Grasshopper, Insect.Ladybug}:
+            #the path found, and so the gates checked along it,
+            #depends on the order neighbors are expanded in
+            step = {Insect.Beetle: beetle,
+                    Insect.Grasshopper: grasshopper,
+                    Insect.Ladybug: ladybug}[insect]
+            came_from = traversal.breadth_first(origin, touching_hive(step), dest)
+        else:
+            came_from = {origin: None}
+        
+        if dest not in came_from:
+            return None
+        return traversal.path_to(came_from, dest)
         
+    def reachable(self, origin):
+        """
+        Floods outward from origin as a sliding tile (the queen,
+        ant, spider and pillbug) in a single breadth-first pass, and
+        returns a dict of every hex reached to the hex it was first
+        reached from, origin mapping to None; following it back
+        from any hex gives a shortest sliding path.
+
+        A hex is only slid into if it is empty and not gated shut
+        by two tiles, and only slid out of if it touches the hive.
+        As in valid_path, the moving tile is still on origin.  The
+        result is kept until the board next changes.
+        """
+        came_from = self._reach.get(origin)
+        if came_from is None:
+            came_from = traversal.slide(origin, self._pieces,
+                                        self.OFFSETS[self.tile_orientation],
+                                        self.GATES[self.tile_orientation],
+                                        self.perimeter)
+            self._reach[origin] = came_from
+        return came_from
+
+    def slide_paths(self, origin, steps):
+        """
+        Returns a dict of every hex a sliding tile can end on after
+        exactly the given number of slides from origin, never
+        revisiting a hex, to one path that gets it there.  The tile
+        is lifted off origin first; every hex slid into must then be
+        empty, and each slide must run along a tile without squeezing
+        between two (see traversal.walks).
+        """
+        occupied = self._pieces
+        if len(occupied.get(origin, ())) == 1:
+            occupied = occupied.keys() - {origin}
+
+        return traversal.walks(origin, occupied,
+                               self.OFFSETS[self.tile_orientation],
+                               self.GATES[self.tile_orientation],
+                               steps)
+
+    @property
+    def perimeter(self):
+        """
+        Returns the set of empty hexes touching the hive, which is
+        kept up to date as tiles come and go.  Do not modify it.
+        """
+        return self._perimeter
+
     def valid_placements(self, color):
         """
-        Finds all hexes where a new, unused piece can be placed
+        Returns a new set of all hexes where a new, unused piece
+        can be placed: the empty hexes touching color and not its
+        opponent, which are kept up to date as tiles come and go.
         """
-        def adjacent_to_opponent(friendly_color, coord):
-            for c,t in self.neighbors(coord):
-                if t and t.color is not friendly_color:
-                    return True
-            return False
+        return set(self._frontier[color])
+
+    def legal_plies(self, color):
+        """
+        Returns a list of every ply available to a color, each
+        already validated and with the .tile attribute populated.
         
-        checked = set()
+        Unlike generating candidates from valid_moves and
+        valid_placements and running each through validate, the
+        position-wide requirements (tiles in hand, Queen Bee placed,
+        whether a tile is pinned by the One Hive rule) are worked
+        out once and shared by every candidate.
         
-        for coords in self._pieces.keys():
-            for c, stack in self.neighbors(coords):
-                if c not in checked and \
-                   stack is None and \
-                   not adjacent_to_opponent(color, c):
-                    yield c
-                checked.add(c)
+        Leeched movements and relocations are additionally held to
+        the Queen Bee and One Hive requirements of ordinary movement,
+        and only one ply is returned per origin/dest pair, no matter
+        how many neighbors the power could be leeched from.
+        """
+        plies = []
+        
+        insects = self.available(color)
+        queen_down = self.queen_placed(color)
+        
+        if self.ply_number in {0,1} and not self.queen_opening_allowed:
+            insects = [i for i in insects if i is not Insect.Queen]
+        if self.ply_number in {6,7} and not queen_down:
+            insects = [i for i in insects if i is Insect.Queen]
+        
+        if not self._pieces:
+            dests = [(0,0)] if self.ply_number == 0 else []
+        elif self.ply_number in {0,1}:
+            dests = {c for coords in self._pieces
+                       for c,t in self.neighbors(coords) if t is None}
+            if self.ply_number == 1:
+                dests = [c for c in dests
+                         if any(t and t.color is not color for n,t in self.neighbors(c))]
+        else:
+            dests = sorted(self._frontier[color])
+        
+        for insect in insects:
+            tile = Tile(color, insect)
+            for dest in dests:
+                plies.append(Placement(tile, dest))
+        
+        def relocations(actor_loc, leech_from=None):
+            """Every neighbor of the actor it may carry to an empty neighbor"""
+            neighbors = dict(self.neighbors(actor_loc))
+            empty = [c for c,t in neighbors.items() if t is None]
+            
+            for origin, t in neighbors.items():
+                if t is None or len(self.stack_at(origin)) > 1 or \
+                    not self.one_hive_rule(origin):
+                    continue
+                for dest in empty:
+                    ply = Relocation(origin, dest, actor_loc, leech_from)
+                    ply.tile = self.piece_at(actor_loc)
+                    plies.append(ply)
+        
+        for origin, stack in list(self._pieces.items()):
+            tile = stack[-1]
+            if tile.color is not color:
+                continue
+            
+            if tile.insect is Insect.Pillbug:
+                relocations(origin)
+            elif tile.insect is Insect.Mosquito:
+                pillbugs = [c for c,t in self.neighbors(origin)
+                            if t and t.insect is Insect.Pillbug]
+                if pillbugs:
+                    relocations(origin, pillbugs[0])
+            
+            if not queen_down or not self.one_hive_rule(origin):
+                continue
+            
+            if tile.insect is Insect.Mosquito:
+                leeched = {}
+                for c,t in self.neighbors(origin):
+                    if t and t.insect is not Insect.Mosquito:
+                        for dest in self.valid_moves(origin, t.insect):
+                            leeched.setdefault(dest, c)
+                
+                for dest, leech_from in leeched.items():
+                    ply = Movement(origin, dest, leech_from)
+                    ply.tile = tile
+                    plies.append(ply)
+            else:
+                for dest in set(self.valid_moves(origin)):
+                    ply = Movement(origin, dest)
+                    ply.tile = tile
+                    if self._movement_violation(ply) is None:
+                        plies.append(ply)
+        
+        return plies
 
     def one_hive_rule(self, ignored_coord=None):
         """
@@ -775,29 +1228,46 @@ class HiveBoard(object):
         If the hive is incomplete while the moving tile is ignored,
         then it means that the hive is broken 'in transit' and 
         the move is illegal.
-        """
-        from queue import Queue
         
-        frontier = Queue()
-        checked = set()
+        The hive is only searched once per position (see
+        articulation_points), so this is otherwise a lookup.
+        """
+        components, articulation = self._hive_structure()
         
-        if ignored_coord in self._pieces and len(self.stack_at(ignored_coord)) == 1:
-            all_pieces = {k for k in self._pieces.keys() if ignored_coord != k}
+        if ignored_coord not in self._pieces or \
+            len(self.stack_at(ignored_coord)) > 1:
+            return components == 1
+        elif len(self._pieces) == 1:
+            return False #a lone tile is the entire hive
+        elif components == 1:
+            return ignored_coord not in articulation
         else:
-            all_pieces = self._pieces.keys()
-        
-        start = next(iter(all_pieces)) #choosing a random start point
-        frontier.put(start)
-        checked.add(start)
+            #lifting a tile only rejoins a hive it sat apart from
+            q, r = ignored_coord
+            isolated = not any((q + dq, r + dr) in self._pieces
+                               for dq, dr in self.OFFSETS[self.tile_orientation])
+            return components == 2 and isolated
+    
+    @property
+    def articulation_points(self):
+        """
+        Returns the set of hexes whose tiles are pinned by the
+        one hive rule: lifting any of them splits the hive.
+        """
+        return self._hive_structure()[1]
+    
+    def _hive_structure(self):
+        """
+        Returns (number of separate groups of tiles, articulation
+        points), found with a single depth-first search (see
+        traversal.articulation) and cached until the board changes.
+        """
+        if self._hive is not None:
+            return self._hive
         
-        while not frontier.empty():
-            current = frontier.get()
-            for n in self.hex_neighbors(self.tile_orientation, current):
-                if n in all_pieces and n not in checked:
-                    frontier.put(n)
-                    checked.add(n)
-
-        return checked == all_pieces
+        self._hive = traversal.articulation(
+            traversal.adjacency(self._pieces, self.OFFSETS[self.tile_orientation]))
+        return self._hive
 
     def free_pieces(self, color):
         """
@@ -808,6 +1278,68 @@ class HiveBoard(object):
             if self.piece_at(coords).color == color and self.one_hive_rule(coords):
                 yield coords
     
+    def features(self, color, mobility=True):
+        """
+        Returns a tuple of numbers describing the position for an
+        evaluation function, named by FEATURES: for color and then
+        its opponent, whether the Queen Bee is down, how many of her
+        neighbors are occupied and empty, the tiles in hand, the
+        hexes a tile could be placed on, the tiles on top that are
+        free to move and pinned by the One Hive rule, the tiles
+        covered by another, and how many movements the free tiles
+        have.
+        
+        Everything is counted in a single pass over the tiles, from
+        the shared articulation points and the derived state kept by
+        _push and _pop.  The movements are those of valid_moves, so
+        a few may yet be illegal, and are by far the costliest part;
+        without mobility they are left as 0.
+        """
+        other = Color.Black if color is Color.White else Color.White
+        components, articulation = self._hive_structure()
+        whole = components == 1 and len(self._pieces) > 1
+        
+        free = {color: [], other: []}
+        pinned = {color: 0, other: 0}
+        covered = {color: 0, other: 0}
+        for coords, stack in self._pieces.items():
+            top = stack[-1]
+            if len(stack) > 1:
+                for tile in stack[:-1]:
+                    covered[tile.color] += 1
+            
+            if whole:
+                lifts = len(stack) > 1 or coords not in articulation
+            else:
+                lifts = self.one_hive_rule(coords)
+            if lifts:
+                free[top.color].append(coords)
+            else:
+                pinned[top.color] += 1
+        
+        retval = []
+        for c in (color, other):
+            queen = self._queens[c]
+            if queen is None:
+                retval.extend((0, 0, 0))
+            else:
+                neighbors = self._touching.get(queen, 0)
+                retval.extend((1, neighbors, 6 - neighbors))
+            
+            in_hand = sum(n - self._counts[(c, i)] for i, n in self.starting_hand.items())
+            moves = 0
+            if mobility and queen is not None:
+                for coords in free[c]:
+                    moves += len(set(self.valid_moves(coords)))
+            
+            retval.extend((in_hand,
+                           len(self._frontier[c]) if in_hand else 0,
+                           len(free[c]),
+                           pinned[c],
+                           covered[c],
+                           moves))
+        return tuple(retval)
+    
     def can_act(self, color):
         """
         Checks all possibilities for placing or moving.
@@ -827,6 +1359,47 @@ class HiveBoard(object):
             else:
                 return False
                 
+    def queen_placed(self, color):
+        """Checks if queen is placed for the given color."""
+        return self._queens[color] is not None
+    
+    @property
+    def queens(self):
+        """
+        Returns a dict of each color to the coordinates of its
+        Queen Bee, or None if she is yet to be placed.
+        """
+        return dict(self._queens)
+    
+    @property
+    def piece_counts(self):
+        """
+        Returns a dict of every (color, insect) to how many such
+        tiles are on the board.
+        """
+        return dict(self._counts)
+    
+    def hand(self, color):
+        """
+        Returns a dict of how many of each insect the given color
+        has yet to place, starting from the board's starting_hand.
+        """
+        return {i: self.starting_hand.get(i, 0) - self._counts[(color, i)]
+                for i in Insect}
+    
+    def available(self, color):
+        """
+        Returns a tuple of the insects the given color still has in
+        hand, in the order of Insect.  It is only worked out again
+        after a tile of the color comes into or goes out of hand.
+        """
+        retval = self._available[color]
+        if retval is None:
+            retval = self._available[color] = tuple(
+                i for i in Insect
+                if self._counts[(color, i)] < self.starting_hand.get(i, 0))
+        return retval
+                
     def find(self, color, insect):
         q = Tile(color, insect)
         for coord, stack in self._pieces.items():
@@ -834,8 +1407,11 @@ class HiveBoard(object):
                 yield (coord, {i for i, h in enumerate(stack) if h == q})
 
     def neighbors(self, coord):
-        for c in self.hex_neighbors(self.tile_orientation, coord):
-            yield (c, self.piece_at(c)) if c in self._pieces else (c, None)
+        q, r = coord
+        for dq, dr in self.OFFSETS[self.tile_orientation]:
+            c = (q + dq, r + dr)
+            stack = self._pieces.get(c)
+            yield (c, stack[-1]) if stack else (c, None)
 
     @property
     def winner(self):
@@ -846,13 +1422,9 @@ class HiveBoard(object):
         as in 'it is False there will be a winner'.  All other
         circumstances return None, to indicate not yet a winner.
         """
-        white_surrounded, black_surrounded = False, False
-        
-        for coords, stack in self._pieces.items():
-            if not white_surrounded and Tile(Color.White, Insect.Queen) in stack:
-                white_surrounded = all(p in self._pieces for p in self.hex_neighbors(self.tile_orientation, coords))
-            if not black_surrounded and Tile(Color.Black, Insect.Queen) in stack:
-                black_surrounded = all(p in self._pieces for p in self.hex_neighbors(self.tile_orientation, coords))
+        white_surrounded, black_surrounded = [
+            coords is not None and self._touching.get(coords) == 6
+            for coords in (self._queens[Color.White], self._queens[Color.Black])]
         
         if white_surrounded and black_surrounded:
             return False
@@ -863,6 +1435,17 @@ class HiveBoard(object):
         else:
             return None
         
+    @property
+    def zobrist(self):
+        """
+        Returns a 64-bit hash of the position: every tile with its
+        coordinates and stack height, plus the side to move.  The
+        tiles' share is kept up to date by place/move/remove.
+        """
+        if self.ply_number % 2:
+            return self._zobrist ^ self.ZOBRIST_BLACK_TO_MOVE
+        return self._zobrist
+        
     @property
     def ply_number(self):
         """
@@ -882,10 +1465,9 @@ class HiveBoard(object):
         have a direction that is a distance > 1.
         """
         delta = (dest[0] - origin[0], dest[1] - origin[1])
-        for d in tile_orientation:
-            if d.value == delta:
-                return d
-        else:
+        try:
+            return HiveBoard.DIRECTIONS[tile_orientation][delta]
+        except KeyError:
             raise RuntimeError
     
     @staticmethod
@@ -894,12 +1476,23 @@ class HiveBoard(object):
         Returns the hex coordinate of a hex one distance away
         from a given coordinate, in the given direction.
         """
-        return tuple(map(sum, zip(coord, direction.value)))
+        dq, dr = direction.value
+        return (coord[0] + dq, coord[1] + dr)
+    
+    def _gates(self, start, end):
+        """
+        Returns the two hexes flanking a single step from start to
+        end; when both are occupied they block a piece sliding through.
+        """
+        (aq, ar), (bq, br) = self.GATES[self.tile_orientation][(end[0] - start[0],
+                                                                end[1] - start[1])]
+        return ((start[0] + aq, start[1] + ar), (start[0] + bq, start[1] + br))
 
     @classmethod
     def hex_neighbors(cls, tile_orientation, origin):
         """Returns a set of all hex coords adjacent to a given coord"""
-        return set(cls.go_direction(origin, d) for d in tile_orientation)
+        q, r = origin
+        return {(q + dq, r + dr) for dq, dr in cls.OFFSETS[tile_orientation]}
                         
     @staticmethod
     def hex_distance(origin, dest):
@@ -916,15 +1509,28 @@ class HiveBoard(object):
     @property
     def radius(self):
         """Returns the max distance of all pieces from 0,0"""
-        maximum = 0
-        
-        for k in self._pieces:
-            maximum = max(self.hex_distance((0,0), k), maximum)
-        
-        return maximum
+        return max(self._distances) if self._distances else 0
             
 
 class IllegalMove(Exception):
     def __init__(self, violation):
         self.violation = violation
         self.message = violation.value
+
+class Verdict(object):
+    """
+    The result of HiveBoard.check: the ply, and the Violation it
+    commits or None.  A Verdict is true when the ply is legal.
+    """
+    __slots__ = ('ply', 'violation')
+    
+    def __init__(self, ply, violation=None):
+        self.ply = ply
+        self.violation = violation
+    
+    @property
+    def legal(self):
+        return self.violation is None
+    
+    def __bool__(self):
+        return self.violation is None
@@ -0,0 +1,240 @@
+"""Monte Carlo Tree Search for Hive, built on hive.HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import math
+import random
+import time
+
+from hive import Insect, Tile, Placement, Movement, Pass
+from engine import SearchResult, evaluate, opponent, signature
+
+def random_ply(board, color, rng=random):
+    """
+    A fast playout policy: returns a random placement or movement
+    for color, or None if it finds nothing to do.
+
+    Rather than validating every candidate, it leans on what the
+    board already knows cheaply -- tiles in hand, valid_placements
+    and which tiles are pinned by the one hive rule -- and trusts
+    valid_moves for the destination.  Plies may therefore stray
+    from the rules now and then, which only matters for the quality
+    of the playout; the tree itself is built from legal_plies.
+    """
+    insects = list(board.available(color))
+    queen_down = board.queen_placed(color)
+
+    if board.ply_number in {0,1} and not board.queen_opening_allowed:
+        insects = [i for i in insects if i is not Insect.Queen]
+    if board.ply_number in {6,7} and not queen_down:
+        insects = [i for i in insects if i is Insect.Queen]
+
+    origins = list(board.free_pieces(color)) if queen_down else []
+
+    options = origins + ([None] if insects else [])
+    rng.shuffle(options)
+
+    for origin in options:
+        if origin is None:
+            if not board._pieces:
+                return Placement(Tile(color, rng.choice(insects)), (0,0))
+
+            if board.ply_number == 1:
+                dests = [c for coords in board._pieces
+                           for c,t in board.neighbors(coords) if t is None]
+            else:
+                dests = list(board.valid_placements(color))
+            if dests:
+                return Placement(Tile(color, rng.choice(insects)), rng.choice(dests))
+        else:
+            tile = board.piece_at(origin)
+            leech_from = None
+
+            if tile.insect is Insect.Mosquito:
+                sources = [c for c,t in board.neighbors(origin)
+                           if t and t.insect is not Insect.Mosquito]
+                if not sources:
+                    continue
+                leech_from = rng.choice(sources)
+                dests = list(board.valid_moves(origin, board.piece_at(leech_from).insect))
+            else:
+                dests = list(board.valid_moves(origin))
+
+            if dests:
+                ply = Movement(origin, rng.choice(dests), leech_from)
+                ply.tile = tile
+                return ply
+
+    return None
+
+class Node(object):
+    def __init__(self, ply, parent, color):
+        self.ply = ply
+        self.parent = parent
+        self.color = color #the color to move from this node
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0 #credited to the color that played self.ply
+
+    def select(self, exploration):
+        """Returns the child with the highest upper confidence bound"""
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda n: n.wins / n.visits + \
+                                 exploration * math.sqrt(log_visits / n.visits))
+
+class MCTS(object):
+    """
+    Monte Carlo Tree Search with UCT selection.  Like engine.Engine
+    it makes and unmakes plies on the board it is given.  The tree
+    is kept between searches; call advance() with each ply played
+    so that the statistics under it carry over to the next search.
+    """
+    def __init__(self,
+                 playouts=1000,
+                 time_limit=None,
+                 playout_depth=60,
+                 exploration=math.sqrt(2),
+                 policy=random_ply,
+                 seed=None):
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.playout_depth = playout_depth
+        self.exploration = exploration
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.root = None
+        self._root_key = None
+
+    def search(self, board, color):
+        """
+        Runs playouts from the position until either budget is
+        spent, and returns a SearchResult for the most visited ply.
+        The score is that ply's win ratio for color, the depth the
+        deepest line in the tree, and the nodes the playouts run.
+        """
+        started = time.perf_counter()
+        deadline = started + self.time_limit if self.time_limit else None
+
+        key = (board.zobrist, color)
+        if self.root is None or self.root.color is not color or \
+            self._root_key not in {None, key}:
+            self.root = Node(None, None, color)
+        self._root_key = key
+
+        playouts, deepest = 0, 0
+
+        while playouts < self.playouts:
+            if deadline and time.perf_counter() >= deadline:
+                break
+            deepest = max(deepest, self._playout(board))
+            playouts += 1
+
+        result = SearchResult(None, 0.0, deepest, playouts,
+                              time.perf_counter() - started)
+
+        if self.root.children:
+            best = max(self.root.children, key=lambda n: n.visits)
+            result.ply = best.ply
+            result.score = best.wins / best.visits
+
+        return result
+
+    def best_ply(self, board, color):
+        """Returns the ply search() prefers, or None"""
+        return self.search(board, color).ply
+
+    def advance(self, ply):
+        """
+        Re-roots the tree at the child reached by ply (which must
+        also be made on the board), keeping its statistics.
+        """
+        if self.root is None:
+            return
+
+        wanted = signature(ply)
+        for child in self.root.children:
+            if signature(child.ply) == wanted:
+                child.parent = None
+                self.root = child
+                self._root_key = None
+                return
+
+        self.root = None
+
+    def _playout(self, board):
+        """
+        One iteration: select down the tree, expand a node, play out
+        the rest of the game at random and back up the result.
+        Returns the depth of the node expanded.
+        """
+        node = self.root
+        depth = 0
+
+        #selection
+        while node.untried == [] and node.children:
+            node = node.select(self.exploration)
+            self._make(board, node.ply)
+            depth += 1
+
+        #expansion
+        if board.winner is None:
+            if node.untried is None:
+                node.untried = board.legal_plies(node.color) or [Pass()]
+                self.rng.shuffle(node.untried)
+
+            ply = node.untried.pop()
+            child = Node(ply, node, opponent(node.color))
+            node.children.append(child)
+            node = child
+            self._make(board, ply)
+            depth += 1
+
+        #simulation
+        color = node.color
+        simulated = 0
+
+        for i in range(self.playout_depth):
+            if board.winner is not None:
+                break
+            self._make(board, self.policy(board, color, self.rng))
+            simulated += 1
+            color = opponent(color)
+
+        reward = self._reward(board, node.color)
+
+        for i in range(depth + simulated):
+            board.unmake()
+
+        #backpropagation
+        while node is not None:
+            node.visits += 1
+            node.wins += 1.0 - reward
+            reward = 1.0 - reward
+            node = node.parent
+
+        return depth
+
+    @staticmethod
+    def _make(board, ply):
+        """Makes ply, or a Pass if the policy found nothing to do"""
+        board.make(ply if ply is not None else Pass())
+
+    @staticmethod
+    def _reward(board, color):
+        """
+        Scores the end of a playout for color: 1 for a win, 0 for a
+        loss, 0.5 for a draw and, for an unfinished game, a value
+        between the two from the static evaluation.
+        """
+        winner = board.winner
+        if winner is False:
+            return 0.5
+        elif winner is not None:
+            return 1.0 if winner is color else 0.0
+        return 0.5 + 0.5 * math.tanh(evaluate(board, color) / 20.0)
@@ -0,0 +1,324 @@
+"""Universal Hive Protocol (UHP) notation for plies on a HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import io
+import re
+
+from hive import (HiveBoard, Color, Insect, Tile, Rule, Placement, Movement,
+                  Relocation, Pass)
+
+#UHP names each tile by color, insect and, for insects with more than
+#one tile, the order it was placed in: wQ, bA1, bA2...  A destination
+#is given by a tile beside it and a mark for the side it lies on
+#(UHP draws hexes pointed, as in Pointed_Directions), or by a tile
+#alone when climbing on top of it.
+PIECE = re.compile(r'^([wb])([QASBGMLP])([1-3]?)$')
+
+BEFORE = {'-': (-1,0), '/': (-1,1), '\\': (0,-1)} #e.g. -wS1 is west of wS1
+AFTER = {'-': (1,0), '/': (1,-1), '\\': (0,1)} #e.g. wS1- is east of wS1
+
+MARKS = dict([(offset, mark + '{0}') for mark, offset in BEFORE.items()] +
+             [(offset, '{0}' + mark) for mark, offset in AFTER.items()])
+
+PASS = 'pass'
+
+def game_type(hand):
+    """The UHP GameTypeString for a starting hand, e.g. Base+MLP"""
+    if any(hand.get(i, 0) != n for i, n in HiveBoard.BASE_HAND.items()) or \
+        any(hand.get(i, 0) not in {0, n} for i, n in HiveBoard.EXPANSIONS.items()):
+        raise ValueError('UHP has no game type for this hand')
+
+    expansions = ''.join(i.value for i in HiveBoard.EXPANSIONS if hand.get(i))
+    return 'Base+' + expansions if expansions else 'Base'
+
+def starting_hand(text):
+    """The starting hand a UHP GameTypeString describes"""
+    base, plus, expansions = text.partition('+')
+    if base != 'Base' or (plus and not expansions):
+        raise ValueError('Bad game type {0!r}'.format(text))
+
+    hand = dict(HiveBoard.BASE_HAND)
+    for letter in expansions:
+        insect = next((i for i in HiveBoard.EXPANSIONS if i.value == letter), None)
+        if insect is None or insect in hand:
+            raise ValueError('Bad game type {0!r}'.format(text))
+        hand[insect] = HiveBoard.EXPANSIONS[insect]
+    return hand
+
+class Notation(object):
+    """
+    Follows a game on a board, knowing which numbered tile is
+    where, so moves can be turned from UHP move strings into plies
+    (parse) and back (emit), and played (play).
+    """
+    def __init__(self, board=None):
+        if board is None:
+            board = HiveBoard()
+        elif board._pieces or board._log:
+            raise ValueError('Notation can only follow a game from an empty board')
+
+        self.board = board
+        self.moves = []
+        self.locations = {} #name -> coords
+        self.names = {} #coords -> names of the stack, bottom first
+
+    @property
+    def color(self):
+        """The color to move"""
+        return Color.Black if self.board.ply_number % 2 else Color.White
+
+    def piece_name(self, tile):
+        """The name the next tile placed like tile will take"""
+        name = tile.color.value + tile.insect.value
+        if self.board.starting_hand.get(tile.insect, 0) > 1:
+            name += str(self.board.piece_counts[(tile.color, tile.insect)] + 1)
+        return name
+
+    def parse(self, text):
+        """
+        Returns the ply a move string describes in the current
+        position.  Raises ValueError if it names tiles that are not
+        there.  The ply is not validated, but
+        where a move could be made more than one way (a tile moving
+        itself, a mosquito leeching, or a pillbug carrying it) the
+        first legal way is chosen.
+        """
+        parts = text.split()
+        if len(parts) == 1 and parts[0].lower() == PASS:
+            return Pass()
+        elif not 1 <= len(parts) <= 2:
+            raise ValueError('Bad move string {0!r}'.format(text))
+
+        name = parts[0]
+        tile = self._tile(name)
+
+        if len(parts) == 1:
+            if self.board._pieces:
+                raise ValueError('{0!r} gives no destination'.format(text))
+            dest = (0,0)
+        else:
+            dest = self._destination(parts[1])
+
+        if name not in self.locations:
+            if name != self.piece_name(tile):
+                raise ValueError('{0} is not the next {1} to place'.format(name, tile))
+            return Placement(tile, dest)
+
+        origin = self.locations[name]
+        if self.names[origin][-1] != name:
+            raise ValueError('{0} is covered and cannot move'.format(name))
+        return self._movement(origin, dest)
+
+    def _tile(self, name):
+        match = PIECE.match(name)
+        if match is None:
+            raise ValueError('Bad piece name {0!r}'.format(name))
+        return Tile(Color(match.group(1)), Insect(match.group(2)))
+
+    def _destination(self, text):
+        """The hex a relative position such as -wS1 or wB1/ names"""
+        if text[0] in BEFORE:
+            name, (dq, dr) = text[1:], BEFORE[text[0]]
+        elif text[-1] in AFTER:
+            name, (dq, dr) = text[:-1], AFTER[text[-1]]
+        else:
+            name, (dq, dr) = text, (0,0)
+
+        try:
+            q, r = self.locations[name]
+        except KeyError:
+            raise ValueError('{0} is not on the board'.format(name))
+        return (q + dq, r + dr)
+
+    def _movement(self, origin, dest):
+        """Every way the tile at origin could get to dest; the first legal one"""
+        board, color = self.board, self.color
+        tile = board.piece_at(origin)
+
+        candidates = []
+        if tile.color is color:
+            candidates.append(Movement(origin, dest))
+            if tile.insect is Insect.Mosquito:
+                candidates.extend(Movement(origin, dest, c) for c,t in board.neighbors(origin)
+                                  if t and t.insect is not Insect.Mosquito)
+
+        for c,t in board.neighbors(origin):
+            if t is None or t.color is not color:
+                continue
+            if t.insect is Insect.Pillbug:
+                candidates.append(Relocation(origin, dest, c))
+            elif t.insect is Insect.Mosquito:
+                candidates.extend(Relocation(origin, dest, c, n) for n,s in board.neighbors(c)
+                                  if s and s.insect is Insect.Pillbug)
+
+        if len(candidates) == 1:
+            return candidates[0]
+        for ply in candidates:
+            if board.check(ply):
+                return ply
+        return candidates[0] if candidates else Movement(origin, dest)
+
+    def emit(self, ply):
+        """Returns the move string for a ply about to be played"""
+        if ply.rule == Rule.Pass:
+            return PASS
+        elif ply.rule == Rule.Place:
+            name = self.piece_name(ply.tile)
+            beneath = None
+        else:
+            name = self.names[ply.origin][-1]
+            beneath = ply.origin
+
+        if not self.board._pieces:
+            return name
+        elif ply.dest in self.names:
+            return '{0} {1}'.format(name, self.names[ply.dest][-1])
+
+        q, r = ply.dest
+        for dq, dr in self.board.OFFSETS[self.board.tile_orientation]:
+            n = (q + dq, r + dr)
+            stack = self.names.get(n)
+            if n == beneath:
+                #the moving tile cannot place itself, but what it leaves can
+                stack = stack[:-1]
+            if stack:
+                return '{0} {1}'.format(name, MARKS[(-dq, -dr)].format(stack[-1]))
+
+        raise ValueError('{0} has no neighbor to be placed by'.format(ply))
+
+    def play(self, move, trusted=False):
+        """
+        Plays a move string or ply, validating it with perform
+        unless trusted, and returns the ply.
+        """
+        if isinstance(move, str):
+            text, ply = move, self.parse(move)
+        else:
+            text, ply = self.emit(move), move
+
+        if ply.rule == Rule.Place:
+            name = self.piece_name(ply.tile)
+        if trusted:
+            self.board.make(ply)
+        else:
+            self.board.perform(ply)
+
+        if ply.rule in {Rule.Move, Rule.Leech_Move,
+                        Rule.Relocate, Rule.Leech_Relocate}:
+            name = self.names[ply.origin].pop()
+            if not self.names[ply.origin]:
+                del self.names[ply.origin]
+
+        if ply.rule != Rule.Pass:
+            self.names.setdefault(ply.dest, []).append(name)
+            self.locations[name] = ply.dest
+        self.moves.append(text.strip())
+        return ply
+
+    def game_string(self):
+        """The UHP GameString: type, state, turn and the moves so far"""
+        winner = self.board.winner
+        if winner is None:
+            state = 'InProgress' if self.moves else 'NotStarted'
+        elif winner is False:
+            state = 'Draw'
+        else:
+            state = winner.name + 'Wins'
+
+        turn = '{0}[{1}]'.format(self.color.name, self.board.ply_number // 2 + 1)
+        return ';'.join([game_type(self.board.starting_hand), state, turn] + self.moves)
+
+def parse_game_string(text):
+    """Returns the game type and the move strings of a UHP GameString"""
+    fields = [f.strip() for f in text.strip().split(';')]
+    if len(fields) < 3:
+        raise ValueError('Not a UHP GameString')
+    return (fields[0], [f for f in fields[3:] if f])
+
+def load(text, board=None, trusted=False):
+    """
+    Plays out a UHP GameString, returning the Notation that followed
+    it.  A board given must start with the hand of the game type.
+    """
+    kind, moves = parse_game_string(text)
+    hand = starting_hand(kind)
+    if board is None:
+        board = HiveBoard(starting_hand=hand)
+    elif {i: n for i, n in board.starting_hand.items() if n} != hand:
+        raise ValueError('The board does not start with a {0} hand'.format(kind))
+
+    notation = Notation(board)
+    for move in moves:
+        notation.play(move, trusted)
+    return notation
+
+def _import_file(path, trusted=True):
+    """
+    Plays out the GameString in a file and returns (path, the game
+    as a binary game record or None, the error or None)
+    """
+    try:
+        with open(path) as f:
+            notation = load(f.read(), trusted=trusted)
+        data = io.BytesIO()
+        notation.board.save_log(data)
+        return (path, data.getvalue(), None)
+    except Exception as e:
+        return (path, None, '{0}: {1}'.format(type(e).__name__, e))
+
+def import_games(paths, workers=None, trusted=True):
+    """
+    Plays out the GameString in each of many files, returning a
+    list of (path, binary game record or None, error or None) in
+    the order given.  With more than one worker the files are
+    shared out in chunks among that many processes.
+    """
+    paths = list(paths)
+    workers = min(workers or 1, len(paths))
+    if workers <= 1:
+        return [_import_file(path, trusted) for path in paths]
+
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_import_file, paths, repeat(trusted),
+                             chunksize=max(1, len(paths) // (workers * 4))))
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description='Imports UHP GameString files')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--out', metavar='FILE',
+                        help='append the games to FILE as binary game records')
+    parser.add_argument('--validate', action='store_true',
+                        help='check every ply against the rules')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='processes to share the files between, 0 for all cpus')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = import_games(args.files, args.workers or os.cpu_count(),
+                           not args.validate)
+    elapsed = time.perf_counter() - started
+
+    imported = [data for path, data, error in results if data is not None]
+    for path, data, error in results:
+        if error:
+            print('{0}: {1}'.format(path, error))
+
+    if args.out:
+        with open(args.out, 'ab') as f:
+            for data in imported:
+                f.write(data)
+
+    print('imported {0} of {1} games in {2:.2f}s'.format(
+        len(imported), len(results), elapsed))
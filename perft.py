@@ -0,0 +1,117 @@
+"""Perft: counts the positions reachable by legal plies from a HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import os
+import time
+
+from hive import HiveBoard, Color, Pass
+
+def side_to_move(board):
+    """Returns the color whose turn it is, from the ply number"""
+    return Color.Black if board.ply_number % 2 else Color.White
+
+def perft(board, depth, color=None):
+    """
+    Counts the positions reached after exactly depth plies, playing
+    every ply from legal_plies, starting with color (by default the
+    side to move).  A side with nothing to do passes, and a finished
+    game counts as a single position.  The board is left as found.
+    """
+    if color is None:
+        color = side_to_move(board)
+    if depth == 0 or board.winner is not None:
+        return 1
+
+    other = Color.Black if color is Color.White else Color.White
+    plies = board.legal_plies(color)
+    if not plies:
+        board.make(Pass())
+        nodes = perft(board, depth - 1, other)
+        board.unmake()
+        return nodes
+    elif depth == 1:
+        return len(plies)
+
+    nodes = 0
+    for ply in plies:
+        board.make(ply)
+        nodes += perft(board, depth - 1, other)
+        board.unmake()
+    return nodes
+
+def divide(board, depth, color=None, workers=None):
+    """
+    Splits perft by root ply, returning a list of (ply, count) in
+    legal_plies order; ply is a Pass if color has to pass.  With more
+    than one worker the root plies are shared out round-robin among
+    that many processes.
+    """
+    if color is None:
+        color = side_to_move(board)
+    if depth == 0 or board.winner is not None:
+        return []
+
+    plies = board.legal_plies(color) or [Pass()]
+
+    workers = min(workers or 1, len(plies))
+    if workers == 1:
+        return list(zip(plies, _perft_root_plies(board, plies, depth, color)))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_perft_root_plies, board, plies[i::workers],
+                               depth, color)
+                   for i in range(workers)]
+        counts = [f.result() for f in futures]
+
+    #deal the counts back out in the order the plies were dealt
+    retval = [None] * len(plies)
+    for i, chunk in enumerate(counts):
+        retval[i::workers] = chunk
+    return list(zip(plies, retval))
+
+def _perft_root_plies(board, plies, depth, color):
+    """Returns the perft count below each of the given root plies"""
+    other = Color.Black if color is Color.White else Color.White
+    counts = []
+    for ply in plies:
+        board.make(ply)
+        counts.append(perft(board, depth - 1, other))
+        board.unmake()
+    return counts
+
+if __name__ == '__main__':
+    import argparse
+    import bench
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--position', choices=sorted(bench.CORPUS),
+                        help='start from a benchmark position, default an empty board')
+    parser.add_argument('--divide', action='store_true',
+                        help='list the count below each root ply')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes to share the root plies between, 0 for all cpus')
+    args = parser.parse_args()
+
+    if args.position:
+        board, color = bench.position(args.position)
+    else:
+        board, color = HiveBoard(), Color.White
+
+    started = time.perf_counter()
+    results = divide(board, args.depth, color, args.workers or os.cpu_count())
+    elapsed = time.perf_counter() - started
+    total = sum(count for ply, count in results) if results else 1
+
+    if args.divide:
+        for ply, count in results:
+            print('{0}: {1}'.format(ply, count))
+    print('perft({0}) = {1} in {2:.2f}s ({3:.0f} positions/sec)'.format(
+        args.depth, total, elapsed, total / elapsed if elapsed else 0.0))
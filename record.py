@@ -0,0 +1,227 @@
+"""A compact binary record of HiveBoard games, for archiving and replay
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import struct
+
+from hive import (HiveBoard, Color, Insect, Tile, Rule, Flat_Directions,
+                  Pointed_Directions, Placement, Movement, Relocation, Pass)
+
+#A game is a header followed by its plies:
+#
+#   magic 'HV', version, flags, number of plies, length of the plies
+#   in bytes (little-endian uint16s); flags bit 0 is set for pointed
+#   tiles, bit 1 if the queen opening is allowed, and bits 2-4 if the
+#   mosquito, ladybug and pillbug respectively are left out of the
+#   starting hand (which is otherwise HiveBoard.STARTING_HAND).
+#
+#Each ply is one byte -- bit 7 set if the ply carries its tile, bits
+#4-6 the rule and bits 0-3 the tile code -- followed by its hexes as
+#pairs of signed bytes: dest for a placement, otherwise origin and
+#dest, then actor_loc for a relocation, then leech_from if leeched.
+#A placement is 3 bytes, an ordinary movement 5, and a pass just 1.
+
+MAGIC = b'HV'
+VERSION = 1
+
+POINTED = 0x01
+QUEEN_OPENING_ALLOWED = 0x02
+WITHOUT = {Insect.Mosquito: 0x04, Insect.Ladybug: 0x08, Insect.Pillbug: 0x10}
+
+HEADER = struct.Struct('<2sBBHH')
+
+PLY_FORMATS = {
+    Rule.Place: struct.Struct('<Bbb'),
+    Rule.Move: struct.Struct('<Bbbbb'),
+    Rule.Leech_Move: struct.Struct('<Bbbbbbb'),
+    Rule.Relocate: struct.Struct('<Bbbbbbb'),
+    Rule.Leech_Relocate: struct.Struct('<Bbbbbbbbb'),
+    Rule.Pass: struct.Struct('<B')
+}
+
+RULES = {r.value: r for r in Rule}
+TILES = [Tile(c, i) for c in Color for i in Insect]
+
+def encode_ply(ply):
+    """Returns the bytes recording a single ply"""
+    if ply.rule == Rule.Place:
+        hexes = (ply.dest,)
+    elif ply.rule == Rule.Move:
+        hexes = (ply.origin, ply.dest)
+    elif ply.rule == Rule.Leech_Move:
+        hexes = (ply.origin, ply.dest, ply.leech_from)
+    elif ply.rule == Rule.Relocate:
+        hexes = (ply.origin, ply.dest, ply.actor_loc)
+    elif ply.rule == Rule.Pass:
+        hexes = ()
+    else:
+        hexes = (ply.origin, ply.dest, ply.actor_loc, ply.leech_from)
+
+    lead = ply.rule.value << 4
+    if ply.tile is not None:
+        lead |= 0x80 | ply.tile.code
+
+    try:
+        return PLY_FORMATS[ply.rule].pack(lead, *(n for coords in hexes for n in coords))
+    except struct.error:
+        raise ValueError('{0} lies beyond the range of a record'.format(ply))
+
+def iter_records(data):
+    """
+    Decodes plies one at a time without building Ply objects,
+    yielding tuples of (rule, tile, origin, dest, actor_loc,
+    leech_from), with None for whatever the rule does not use.
+    """
+    pos, end = 0, len(data)
+    while pos < end:
+        lead = data[pos]
+        rule = RULES[lead >> 4 & 0x07]
+        fmt = PLY_FORMATS[rule]
+        fields = fmt.unpack_from(data, pos)
+        pos += fmt.size
+
+        tile = TILES[lead & 0x0F] if lead & 0x80 else None
+        hexes = list(zip(fields[1::2], fields[2::2]))
+
+        if rule == Rule.Place:
+            yield (rule, tile, None, hexes[0], None, None)
+        elif rule == Rule.Move:
+            yield (rule, tile, hexes[0], hexes[1], None, None)
+        elif rule == Rule.Leech_Move:
+            yield (rule, tile, hexes[0], hexes[1], None, hexes[2])
+        elif rule == Rule.Relocate:
+            yield (rule, tile, hexes[0], hexes[1], hexes[2], None)
+        elif rule == Rule.Pass:
+            yield (rule, tile, None, None, None, None)
+        else:
+            yield (rule, tile, hexes[0], hexes[1], hexes[2], hexes[3])
+
+def to_ply(record):
+    """Builds the Ply a tuple from iter_records describes"""
+    rule, tile, origin, dest, actor_loc, leech_from = record
+
+    if rule == Rule.Place:
+        return Placement(tile, dest)
+    elif rule == Rule.Pass:
+        return Pass()
+    elif rule in {Rule.Move, Rule.Leech_Move}:
+        ply = Movement(origin, dest, leech_from)
+    else:
+        ply = Relocation(origin, dest, actor_loc, leech_from)
+
+    ply.tile = tile
+    return ply
+
+class GameRecord(object):
+    """The plies of one recorded game, still encoded, and its settings"""
+    def __init__(self, data, ply_count,
+                 tile_orientation=Flat_Directions,
+                 queen_opening_allowed=False,
+                 starting_hand=None):
+        self.data = data
+        self.ply_count = ply_count
+        self.tile_orientation = tile_orientation
+        self.queen_opening_allowed = queen_opening_allowed
+        self.starting_hand = starting_hand
+
+    def records(self):
+        return iter_records(self.data)
+
+    def plies(self):
+        for record in iter_records(self.data):
+            yield to_ply(record)
+
+    def board(self):
+        """Returns an empty HiveBoard with the game's settings"""
+        return HiveBoard(self.tile_orientation, self.queen_opening_allowed,
+                         self.starting_hand)
+
+    def replay(self):
+        """
+        Plays the game out on a new board, yielding the board after
+        each ply.  The tiles are moved directly from the records, no
+        Ply objects being built, so the game log is padded with None
+        to keep ply_number right and the plies cannot be unmade.
+        """
+        board = self.board()
+        for rule, tile, origin, dest, actor_loc, leech_from in iter_records(self.data):
+            if rule == Rule.Place:
+                board.place(tile, dest)
+            elif rule != Rule.Pass:
+                board.move(origin, dest)
+            board._log.append(None)
+            yield board
+
+def write_game(f, board):
+    """
+    Appends the game log of board, with its settings, to the
+    binary file f.  Raises ValueError if the log holds anything
+    but plies, or the board starts from a hand that is not the base
+    game with some of the expansions.
+    """
+    if any(ply is None for ply in board._log):
+        raise ValueError('Only a log of plies can be recorded')
+
+    data = b''.join(encode_ply(ply) for ply in board._log)
+    if len(data) > 0xFFFF:
+        raise ValueError('Game too long to record')
+
+    flags = 0
+    if board.tile_orientation is Pointed_Directions:
+        flags |= POINTED
+    if board.queen_opening_allowed:
+        flags |= QUEEN_OPENING_ALLOWED
+
+    hand = board.starting_hand
+    if any(hand.get(i, 0) != n for i, n in HiveBoard.BASE_HAND.items()):
+        raise ValueError('Only hands from the base game can be recorded')
+    for insect, bit in WITHOUT.items():
+        if not hand.get(insect):
+            flags |= bit
+        elif hand[insect] != HiveBoard.EXPANSIONS[insect]:
+            raise ValueError('Only hands from the base game can be recorded')
+
+    f.write(HEADER.pack(MAGIC, VERSION, flags, len(board._log), len(data)))
+    f.write(data)
+
+def read_game(f):
+    """
+    Reads the next game from the binary file f, returning a
+    GameRecord, or None at the end of the file.  Raises ValueError
+    if what follows is not a game record.
+    """
+    header = f.read(HEADER.size)
+    if not header:
+        return None
+    elif len(header) < HEADER.size:
+        raise ValueError('Truncated game record')
+
+    magic, version, flags, ply_count, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError('Not a game record')
+    elif version != VERSION:
+        raise ValueError('Unsupported game record version {0}'.format(version))
+
+    data = f.read(length)
+    if len(data) < length:
+        raise ValueError('Truncated game record')
+
+    hand = dict(HiveBoard.STARTING_HAND)
+    for insect, bit in WITHOUT.items():
+        if flags & bit:
+            del hand[insect]
+
+    return GameRecord(data, ply_count,
+                      Pointed_Directions if flags & POINTED else Flat_Directions,
+                      bool(flags & QUEEN_OPENING_ALLOWED), hand)
+
+def read_games(f):
+    """Yields a GameRecord for each game left in the binary file f"""
+    game = read_game(f)
+    while game is not None:
+        yield game
+        game = read_game(f)
@@ -0,0 +1,114 @@
+"""Steps back and forth through a recorded game on a HiveBoard
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+from hive import HiveBoard
+
+class Replayer(object):
+    """
+    Plays a stream of plies onto a board, pulling each from the
+    stream only when it is first needed, and keeps a snapshot of
+    the tiles every interval plies.  Seeking to any ply then costs
+    at most about interval plies: the board is stepped there
+    directly, undone back to it, or reset from the nearest
+    checkpoint and stepped on, whichever is shortest.
+
+    Each ply is validated with perform the first time it is played
+    unless trusted is set, in which case make is used throughout.
+    Once played, a ply is known to be legal and is only ever made.
+    """
+    def __init__(self, plies, board=None, interval=16, trusted=False):
+        if board is None:
+            board = HiveBoard()
+        elif board._pieces or board._log:
+            raise ValueError('A game can only be replayed onto an empty board')
+
+        self.board = board
+        self.interval = interval
+        self.trusted = trusted
+        self._source = iter(plies)
+        self._plies = []
+        self._checked = 0 #plies known to be legal
+        self._checkpoints = {0: {}}
+
+    @classmethod
+    def from_record(cls, game, interval=16, trusted=True):
+        """Replays a record.GameRecord, trusted by default"""
+        return cls(game.plies(), game.board(), interval, trusted)
+
+    @property
+    def ply_number(self):
+        return self.board.ply_number
+
+    def _fetch(self, n):
+        """Pulls plies from the stream until there are n; False if it runs dry"""
+        while len(self._plies) < n:
+            try:
+                self._plies.append(next(self._source))
+            except StopIteration:
+                return False
+        return True
+
+    def forward(self):
+        """Plays the next ply, returning it; IndexError at the end of the game"""
+        index = self.board.ply_number
+        if not self._fetch(index + 1):
+            raise IndexError('No ply {0} in the game'.format(index + 1))
+
+        ply = self._plies[index]
+        if self.trusted or index < self._checked:
+            self.board.make(ply)
+        else:
+            self.board.perform(ply)
+            self._checked = index + 1
+
+        if self.board.ply_number % self.interval == 0:
+            self._checkpoints.setdefault(self.board.ply_number,
+                                         {c: tuple(s) for c, s in self.board._pieces.items()})
+        return ply
+
+    def back(self):
+        """Undoes the last ply, returning it"""
+        return self.board.unmake()
+
+    def seek(self, n):
+        """
+        Brings the board to the position after n plies and returns
+        it.  Raises IndexError if the game is shorter than that.
+        """
+        if n < 0 or not self._fetch(n):
+            raise IndexError('No ply {0} in the game'.format(n))
+
+        current = self.board.ply_number
+        checkpoint = max(c for c in self._checkpoints if c <= n)
+
+        if n < current:
+            if n - checkpoint < current - n:
+                self._restore(checkpoint)
+        elif checkpoint > current:
+            self._restore(checkpoint)
+
+        while self.board.ply_number > n:
+            self.back()
+        while self.board.ply_number < n:
+            self.forward()
+        return self.board
+
+    def _restore(self, checkpoint):
+        """Resets the board to a checkpoint, touching only the hexes that differ"""
+        board, tiles = self.board, self._checkpoints[checkpoint]
+
+        for coords in [c for c, s in board._pieces.items() if tuple(s) != tiles.get(c)]:
+            while coords in board._pieces:
+                board._pop(coords)
+        for coords, stack in tiles.items():
+            if coords not in board._pieces:
+                for tile in stack:
+                    board._push(tile, coords)
+
+        board._forget()
+        board._log[:] = self._plies[:checkpoint]
@@ -0,0 +1,141 @@
+"""Plays HiveBoard games against itself and records them, for training
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+import io
+import random
+import time
+
+from hive import HiveBoard, Color, Pass
+from engine import Engine
+
+#A policy is called as policy(board, color, rng) and returns one of
+#board.legal_plies(color), or None if there are none.  It must be
+#picklable (a module-level function, or an instance of a module-level
+#class) to be shared with worker processes.
+
+def random_policy(board, color, rng):
+    """Picks uniformly among the legal plies"""
+    plies = board.legal_plies(color)
+    return rng.choice(plies) if plies else None
+
+class EnginePolicy(object):
+    """Plays the best ply an engine.Engine finds to a fixed depth"""
+    def __init__(self, max_depth=2, node_limit=None):
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self._engine = None
+
+    def __getstate__(self):
+        #the engine and its table are rebuilt in each process
+        return {'max_depth': self.max_depth, 'node_limit': self.node_limit,
+                '_engine': None}
+
+    def __call__(self, board, color, rng):
+        if self._engine is None:
+            self._engine = Engine(self.max_depth, node_limit=self.node_limit)
+        return self._engine.search(board, color).ply
+
+POLICIES = {
+    'random': random_policy,
+    'engine': EnginePolicy()
+}
+
+def play_game(policy, seed=None, max_plies=200, opening=0, board=None):
+    """
+    Plays a game from the opening until there is a winner, both
+    sides are stuck, or max_plies have been played, and returns the
+    board with the game in its log.  A side with nothing to do
+    passes.  The first opening plies are played at random, so a
+    deterministic policy still plays a variety of games.
+    """
+    rng = random.Random(seed)
+    if board is None:
+        board = HiveBoard()
+
+    passes = 0
+    while board.winner is None and board.ply_number < max_plies and passes < 2:
+        color = Color.Black if board.ply_number % 2 else Color.White
+        if board.ply_number < opening:
+            ply = random_policy(board, color, rng)
+        else:
+            ply = policy(board, color, rng)
+
+        if ply is None:
+            ply = Pass()
+            passes += 1
+        else:
+            passes = 0
+        board.make(ply)
+
+    return board
+
+def _play_recorded(policy, seed, max_plies, opening):
+    """Plays one game and returns (its binary game record, plies played)"""
+    board = play_game(policy, seed, max_plies, opening)
+    data = io.BytesIO()
+    board.save_log(data)
+    return (data.getvalue(), board.ply_number)
+
+def run(games, out, policy=random_policy, workers=1, seed=0,
+        max_plies=200, opening=0):
+    """
+    Plays games, writing each to the binary file out as a record
+    (see the record module) as soon as it finishes, in whatever
+    order they finish; with more than one worker the games are
+    played in that many processes.  Game i is seeded with seed + i.
+    Returns a dict of the games and plies played, the seconds taken,
+    and the games per hour and plies per second that makes.
+    """
+    started = time.perf_counter()
+    plies = 0
+
+    if workers <= 1:
+        for i in range(games):
+            data, count = _play_recorded(policy, seed + i, max_plies, opening)
+            out.write(data)
+            plies += count
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_play_recorded, policy, seed + i, max_plies, opening)
+                       for i in range(games)]
+            for future in as_completed(futures):
+                data, count = future.result()
+                out.write(data)
+                plies += count
+
+    elapsed = time.perf_counter() - started
+    return {'games': games,
+            'plies': plies,
+            'seconds': elapsed,
+            'games_per_hour': games * 3600.0 / elapsed if elapsed else 0.0,
+            'plies_per_second': plies / elapsed if elapsed else 0.0}
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('games', type=int)
+    parser.add_argument('out', help='file to append the game records to')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes to play the games in, 0 for all cpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--opening', type=int, default=0,
+                        help='plies to play at random before the policy takes over')
+    args = parser.parse_args()
+
+    with open(args.out, 'ab') as f:
+        stats = run(args.games, f, POLICIES[args.policy], args.workers or os.cpu_count(),
+                    args.seed, args.max_plies, args.opening)
+
+    print('{games} games, {plies} plies in {seconds:.2f}s: '
+          '{games_per_hour:.0f} games/hour, {plies_per_second:.0f} plies/sec'.format(**stats))
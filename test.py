@@ -1,5 +1,24 @@
 import unittest
+import io
+import os
+import random
+import tempfile
 import hive
+import engine
+import arrayboard
+import mcts
+import bench
+import perft
+import traversal
+import record
+import replay
+import notation
+import selfplay
+
+try:
+    import batch
+except ImportError: #numpy is optional
+    batch = None
 
 class TestHive(unittest.TestCase):
     
@@ -30,6 +49,23 @@ class TestHive(unittest.TestCase):
         piece2 = hive.Tile(hive.Color.Black, hive.Insect.Queen)
         self.assertNotEqual(piece, piece2)
         
+    def test_tiles_interned(self):
+        import pickle
+        
+        piece = hive.Tile(hive.Color.White, hive.Insect.Queen)
+        self.assertIs(hive.Tile(hive.Color.White, hive.Insect.Queen), piece)
+        self.assertIs(pickle.loads(pickle.dumps(piece)), piece)
+        
+        tiles = {hive.Tile(c, i) for c in hive.Color for i in hive.Insect}
+        self.assertEqual(len(tiles), 16)
+        self.assertEqual(sorted(t.code for t in tiles), list(range(16)))
+        self.assertIn(piece, tiles)
+        
+        with self.assertRaises(AttributeError):
+            piece.insect = hive.Insect.Ant
+        with self.assertRaises(AttributeError):
+            piece.note = 'tiles have no __dict__'
+        
     def test_place(self):
         board = hive.HiveBoard()
         
@@ -100,6 +136,65 @@ class TestHive(unittest.TestCase):
         self.assertIsInstance(board._log[1], hive.Ply)
         self.assertEqual(board._log[1].tile, t2)
         
+    def test_make_unmake(self):
+        board = hive.HiveBoard(queen_opening_allowed=True)
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wB',
+                           (1,1): 'bP', (-1,0): 'wM', (0,2): 'bA'})
+        board.move((0,-1), (0,0))
+        
+        before = {k: list(v) for k,v in board._pieces.items()}
+        
+        for color in hive.Color:
+            for ply in board.legal_plies(color):
+                board.make(ply)
+                self.assertIs(board._log[-1], ply)
+                self.assertIs(board.unmake(), ply)
+                self.assertEqual(board._pieces, before)
+        
+        board.perform(hive.Movement((0,0), (1,0)))
+        board.perform(hive.Relocation((0,2), (1,2), (1,1)))
+        board.undo()
+        board.undo()
+        
+        self.assertEqual(board.ply_number, 0)
+        self.assertEqual(board.stack_at((0,0)),
+                         [hive.Tile(hive.Color.White, hive.Insect.Queen),
+                          hive.Tile(hive.Color.White, hive.Insect.Beetle)])
+        self.assertEqual(board._pieces, before)
+        
+        with self.assertRaises(IndexError):
+            board.unmake()
+        
+    def test_zobrist(self):
+        board = hive.HiveBoard()
+        self.assertEqual(board.zobrist, 0)
+        
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wB', (0,2): 'bA'})
+        key = board.zobrist
+        
+        other = hive.HiveBoard()
+        other.quick_setup({(0,2): 'bA', (0,-1): 'wB', (0,1): 'bQ', (0,0): 'wQ'})
+        self.assertEqual(other.zobrist, key)
+        
+        board.move((0,-1), (0,0))
+        climbed = board.zobrist
+        self.assertNotEqual(climbed, key)
+        
+        other.move((0,-1), (1,-1))
+        other.move((1,-1), (0,0))
+        self.assertEqual(other.zobrist, climbed)
+        
+        board.move((0,0), (0,-1))
+        self.assertEqual(board.zobrist, key)
+        
+        board.make(hive.Movement((0,2), (1,1)))
+        self.assertNotEqual(board.zobrist, key)
+        board.unmake()
+        self.assertEqual(board.zobrist, key)
+        
+        board._log.append(None)
+        self.assertEqual(board.zobrist, key ^ hive.HiveBoard.ZOBRIST_BLACK_TO_MOVE)
+        
     def test_rule_movement_before_queen_placed(self):
         board = hive.HiveBoard()
 
@@ -333,6 +428,74 @@ class TestHive(unittest.TestCase):
         self.assertSetEqual(set(board.valid_moves( (-1,0) )),
                             set([(-1,3), (1,0)]))
     
+    def test_reachable(self):
+        board = hive.HiveBoard(queen_opening_allowed=True)
+        board.quick_setup({(0,-1): 'wQ', (1,-1): 'bQ', (1,0): 'wG',
+                           (0,1): 'bG', (-1,1): 'wS', (2,-1): 'wA'})
+        
+        reached = board.reachable((2,-1))
+        self.assertNotIn((0,0), reached) #gated shut on every side
+        self.assertNotIn((0,0), set(board.valid_moves((2,-1))))
+        self.assertIn((-1,0), set(board.valid_moves((2,-1))))
+        
+        path = board.valid_path((2,-1), (-1,0))
+        self.assertEqual(path[0], (2,-1))
+        self.assertEqual(path[-1], (-1,0))
+        for current, following in zip(path, path[1:]):
+            self.assertEqual(reached[following], current)
+        
+        self.assertEqual(board.slide_paths((-1,1), 3),
+                         {(-1,-1): ((-1,1), (0,0), (-1,0), (-1,-1)),
+                          (1,1): ((-1,1), (-1,2), (0,2), (1,1))})
+        self.assertSetEqual(set(board.valid_moves((-1,1))), {(-1,-1), (1,1)})
+    
+    def test_validate_many(self):
+        for name in sorted(bench.CORPUS):
+            board, color = bench.position(name)
+            plies = board.legal_plies(color)
+            plies.extend(hive.Movement(coords, dest)
+                         for coords in board._pieces for dest in board.perimeter)
+        
+            expected = []
+            for ply in plies:
+                board._forget()
+                try:
+                    expected.append(board.validate(ply))
+                except hive.IllegalMove as e:
+                    expected.append(e.violation)
+        
+            board._forget()
+            self.assertEqual(board.validate_many(plies), expected, name)
+        
+        board = hive.HiveBoard(queen_opening_allowed=True)
+        board.quick_setup({(0,0): 'wQ', (1,0): 'bQ', (-1,0): 'wM', (-1,1): 'wG'})
+        jump = hive.Movement((-1,0), (2,0), (-1,1))
+        self.assertEqual(board.validate_many([jump, hive.Movement((-1,0), (2,-1), (-1,1))]),
+                         [jump, hive.Violation.Unavailable_Action])
+    
+    def test_check(self):
+        board, color = bench.position('midgame_stacks')
+        for ply in bench._candidates(board, color):
+            verdict = board.check(ply)
+            self.assertIs(verdict.ply, ply)
+            self.assertEqual(bool(verdict), verdict.legal)
+            if verdict:
+                self.assertIsNone(verdict.violation)
+                self.assertIs(board.validate(ply), ply)
+            else:
+                with self.assertRaises(hive.IllegalMove) as e:
+                    board.validate(ply)
+                self.assertIs(e.exception.violation, verdict.violation)
+        
+        board = hive.HiveBoard(queen_opening_allowed=True)
+        board.quick_setup({(0,0): 'wQ', (1,0): 'bQ', (-1,0): 'wM', (-1,1): 'wG'})
+        verdict = board.check(hive.Movement((-1,0), (2,-1), (-1,1)))
+        self.assertFalse(verdict.legal)
+        self.assertIs(verdict.violation, hive.Violation.Unavailable_Action)
+        with self.assertRaises(hive.IllegalMove):
+            board.perform(verdict.ply)
+        self.assertTrue(board.check(hive.Movement((-1,0), (2,0), (-1,1))))
+    
     def test_ladybug_valid_moves(self):
         board = hive.HiveBoard(queen_opening_allowed=True)
         
@@ -563,6 +726,35 @@ class TestHive(unittest.TestCase):
         
         board.quick_setup(pieces)
         board.perform(hive.Movement((-1,0), (-1,-2)))
+        
+        #a single slide is too short
+        board = hive.HiveBoard()
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wS'})
+        board._log = [None] * 6
+        self.assertIs(board.check(hive.Movement((0,-1), (1,-1))).violation,
+                      hive.Violation.Invalid_Distance_Attempted)
+        self.assertEqual({p.dest for p in board.legal_plies(hive.Color.White)
+                          if p.rule == hive.Rule.Move and p.origin == (0,-1)},
+                         {d for d in board.valid_moves((0,-1))})
+    
+    def test_spider_walks(self):
+        #(0,-1) to (-1,0) has nothing but the spider's own hex beside it
+        board = hive.HiveBoard()
+        board.quick_setup({(1,0): 'bM', (1,1): 'bL', (0,1): 'wM', (1,-1): 'wP',
+                           (-1,1): 'wQ', (0,0): 'bS', (2,0): 'bQ'})
+        board._log = [None] * 9
+        self.assertEqual(set(board.slide_paths((0,0), 3)), {(-2,2), (2,-2)})
+        for dest in [(-2,1), (1,-2)]:
+            self.assertIs(board.check(hive.Movement((0,0), dest)).violation,
+                          hive.Violation.Invalid_Distance_Attempted)
+        
+        #the hex the spider leaves neither gates it nor keeps it in contact
+        board = hive.HiveBoard()
+        board.quick_setup({(0,0): 'wA', (1,-1): 'bM', (-1,0): 'wB', (1,-2): 'bS',
+                           (-1,-1): 'wS', (1,-3): 'bS', (-2,1): 'wQ', (2,-2): 'bQ'})
+        board._log = [None] * 8
+        self.assertEqual(set(board.slide_paths((-1,-1), 3)), {(-3,2), (0,-3)})
+        self.assertIsNone(board.check(hive.Movement((-1,-1), (0,-3))).violation)
     
     def test_not_isolated(self):
         board = hive.HiveBoard(queen_opening_allowed=True)
@@ -742,6 +934,36 @@ class TestHive(unittest.TestCase):
         self.assertEqual(set(board.free_pieces(hive.Color.White)), {(0,-1)})
         self.assertEqual(set(board.free_pieces(hive.Color.Black)), {(0,2)})
         
+    def test_features(self):
+        board = hive.HiveBoard()
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wA', (0,2): ['bA', 'wB']})
+        features = dict(zip(hive.HiveBoard.FEATURES, board.features(hive.Color.Black)))
+        self.assertEqual(len(features), len(board.features(hive.Color.White)))
+        self.assertEqual(features['own_queen_neighbors'], 2)
+        self.assertEqual(features['own_queen_liberties'], 4)
+        self.assertEqual(features['own_in_hand'], 12)
+        self.assertEqual(features['own_free'], 0)
+        self.assertEqual(features['own_pinned'], 1)
+        self.assertEqual(features['own_covered'], 1)
+        self.assertEqual(features['opp_in_hand'], 11)
+        self.assertEqual(features['opp_free'], 2)
+        self.assertEqual(features['opp_pinned'], 1)
+        self.assertEqual(features['opp_placements'], len(board.valid_placements(hive.Color.White)))
+        self.assertEqual(features['opp_moves'],
+                         len(set(board.valid_moves((0,-1)))) + len(set(board.valid_moves((0,2)))))
+        self.assertEqual(board.features(hive.Color.Black, mobility=False)[-1], 0)
+        
+        for seed in range(5):
+            board = random_game(seed, 30)
+            for color in hive.Color:
+                features = dict(zip(hive.HiveBoard.FEATURES, board.features(color)))
+                free = list(board.free_pieces(color))
+                self.assertEqual(features['own_free'], len(free))
+                self.assertEqual(features['own_in_hand'], sum(board.hand(color).values()))
+                if board.queen_placed(color):
+                    self.assertEqual(features['own_moves'],
+                                     sum(len(set(board.valid_moves(c))) for c in free))
+        
     def test_winner_found(self):
         board = hive.HiveBoard()
         self.assertIsNone(board.winner)
@@ -775,6 +997,84 @@ class TestHive(unittest.TestCase):
         board.quick_setup(pieces)
         self.assertFalse(board.winner)
     
+    def test_articulation_points(self):
+        board = hive.HiveBoard()
+        self.assertEqual(board.articulation_points, set())
+        
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wB', (0,2): 'bA'})
+        self.assertEqual(board.articulation_points, {(0,0), (0,1)})
+        
+        board.quick_setup({(1,0): 'wA'})
+        self.assertEqual(board.articulation_points, {(0,0), (0,1)})
+        
+        board.quick_setup({(1,-1): 'wS'})
+        self.assertEqual(board.articulation_points, {(0,1)})
+        
+        board.move((0,2), (5,5))
+        self.assertFalse(board.one_hive_rule())
+        self.assertTrue(board.one_hive_rule((5,5)))
+        self.assertFalse(board.one_hive_rule((0,-1)))
+        
+    def test_hand(self):
+        board = hive.HiveBoard(starting_hand=hive.HiveBoard.BASE_HAND)
+        self.assertEqual({p.tile.insect for p in board.legal_plies(hive.Color.White)},
+                         {hive.Insect.Spider, hive.Insect.Beetle,
+                          hive.Insect.Grasshopper, hive.Insect.Ant})
+        self.assertEqual(board.hand(hive.Color.White)[hive.Insect.Pillbug], 0)
+        
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wA', (0,-2): 'wA',
+                           (0,2): 'bA', (1,-3): 'wA', (0,3): 'bG'})
+        board._log = [None] * 8
+        self.assertEqual(board.available(hive.Color.White),
+                         (hive.Insect.Beetle, hive.Insect.Grasshopper, hive.Insect.Spider))
+        self.assertIs(board.check(hive.Placement(hive.Tile(hive.Color.White, hive.Insect.Ant),
+                                                 (-1,-1))).violation,
+                      hive.Violation.Not_In_Hand)
+        
+        board.make(hive.Movement((1,-3), (1,-2)))
+        board.make(hive.Movement((0,3), (1,2)))
+        self.assertNotIn(hive.Insect.Ant, board.available(hive.Color.White))
+        board.remove((1,-2))
+        self.assertIn(hive.Insect.Ant, board.available(hive.Color.White))
+        self.assertEqual(board.hand(hive.Color.White)[hive.Insect.Ant], 1)
+        
+        f = io.BytesIO()
+        hive.HiveBoard(starting_hand=hive.HiveBoard.BASE_HAND).save_log(f)
+        f.seek(0)
+        loaded = hive.HiveBoard()
+        loaded.load_log(f)
+        self.assertEqual(loaded.starting_hand, hive.HiveBoard.BASE_HAND)
+        
+        game = notation.load('Base+M;InProgress;White[1]')
+        self.assertEqual(game.board.available(hive.Color.Black)[-1], hive.Insect.Mosquito)
+        self.assertTrue(game.game_string().startswith('Base+M;'))
+        
+    def test_frontier(self):
+        def sweep(board, color):
+            found = set()
+            for coords in board._pieces:
+                for n,t in board.neighbors(coords):
+                    if t is None and all(s is None or s.color is color
+                                         for c,s in board.neighbors(n)):
+                        found.add(n)
+            return found
+        
+        board = random_game(7, 40)
+        while board.ply_number:
+            for color in hive.Color:
+                self.assertEqual(board.valid_placements(color), sweep(board, color))
+            board.unmake()
+        self.assertEqual(board.valid_placements(hive.Color.White), set())
+        
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wB'})
+        board.move((0,-1), (0,0))
+        board.move((0,0), (0,-1))
+        board.move((0,-1), (0,0))
+        for color in hive.Color:
+            self.assertEqual(board.valid_placements(color), sweep(board, color))
+        self.assertIn((0,-1), board.valid_placements(hive.Color.White))
+        self.assertNotIn((1,0), board.valid_placements(hive.Color.White))
+        
     def test_can_act(self):
         board = hive.HiveBoard()
         self.assertTrue(board.can_act(hive.Color.White))
@@ -824,6 +1124,45 @@ class TestHive(unittest.TestCase):
         board.place(hive.Tile(hive.Color.Black, hive.Insect.Spider), (1,0))
         self.assertEqual(board.radius, 2)
 
+    def test_derived_state(self):
+        def expected(board):
+            queens = {c: None for c in hive.Color}
+            counts = {(c, i): 0 for c in hive.Color for i in hive.Insect}
+            for coords, stack in board._pieces.items():
+                for t in stack:
+                    counts[(t.color, t.insect)] += 1
+                    if t.insect is hive.Insect.Queen:
+                        queens[t.color] = coords
+            perimeter = {c for coords in board._pieces
+                           for c,t in board.neighbors(coords) if t is None}
+            radius = max([board.hex_distance((0,0), c) for c in board._pieces] or [0])
+            return (queens, counts, perimeter, radius)
+        
+        board = hive.HiveBoard()
+        color = hive.Color.White
+        for i in range(40):
+            plies = board.legal_plies(color)
+            if not plies or board.winner is not None:
+                break
+            board.make(plies[(i * 5) % len(plies)])
+            color = hive.Color.Black if color is hive.Color.White else hive.Color.White
+            
+            self.assertEqual((board.queens, board.piece_counts, board.perimeter, board.radius),
+                             expected(board))
+        
+        self.assertGreater(board.ply_number, 20)
+        while board.ply_number:
+            board.unmake()
+        self.assertEqual((board.queens, board.piece_counts, board.perimeter, board.radius),
+                         expected(board))
+        self.assertEqual(board._touching, {})
+        
+        board, color = bench.position('midgame_stacks')
+        self.assertEqual(board.queens, {hive.Color.White: (-2,0), hive.Color.Black: (1,1)})
+        self.assertEqual(board.piece_counts[(hive.Color.White, hive.Insect.Beetle)], 2)
+        self.assertEqual((board.queens, board.piece_counts, board.perimeter, board.radius),
+                         expected(board))
+        
     def test_go_direction(self):
         board = hive.HiveBoard(hive.Flat_Directions)
         self.assertEqual(board.go_direction((0,0), hive.Flat_Directions.N), (0,-1))
@@ -893,6 +1232,574 @@ class TestHive(unittest.TestCase):
                                  (-1,0): None
                              })
 
+    def plies_by_trial(self, board, color):
+        """Candidates from valid_moves/valid_placements, kept if validate allows"""
+        candidates = []
+        
+        for insect, count in board.hand(color).items():
+            if count > 0:
+                for dest in set(board.valid_placements(color)):
+                    candidates.append(hive.Placement(hive.Tile(color, insect), dest))
+        
+        for coords in list(board._pieces):
+            if board.piece_at(coords).color is not color:
+                continue
+            for dest in set(board.valid_moves(coords)):
+                candidates.append(hive.Movement(coords, dest))
+            if board.piece_at(coords).insect is hive.Insect.Pillbug:
+                for origin in board.hex_neighbors(board.tile_orientation, coords):
+                    for dest in board.hex_neighbors(board.tile_orientation, coords):
+                        candidates.append(hive.Relocation(origin, dest, coords))
+        
+        legal = set()
+        for ply in candidates:
+            try:
+                board.validate(ply)
+            except (hive.IllegalMove, KeyError):
+                continue
+            legal.add(self.ply_key(ply))
+        return legal
+    
+    @staticmethod
+    def ply_key(ply):
+        return (ply.rule, str(ply.tile), getattr(ply, 'origin', None),
+                ply.dest, getattr(ply, 'actor_loc', None))
+    
+    def test_legal_plies(self):
+        board = hive.HiveBoard()
+        plies = board.legal_plies(hive.Color.White)
+        self.assertEqual({p.dest for p in plies}, {(0,0)})
+        self.assertEqual({p.tile.insect for p in plies},
+                         set(hive.Insect) - {hive.Insect.Queen})
+        
+        board.perform(hive.Placement(hive.Tile(hive.Color.White, hive.Insect.Ant), (0,0)))
+        self.assertEqual({p.dest for p in board.legal_plies(hive.Color.Black)},
+                         board.hex_neighbors(board.tile_orientation, (0,0)))
+        
+        positions = [
+            {(0,0): 'wQ', (0,1): 'bQ', (-1,0): 'wA', (0,2): 'bA'},
+            {(0,0): 'wQ', (0,1): 'bQ', (1,-1): 'wB', (1,1): 'bM',
+             (2,-1): 'wG', (2,0): 'bG', (0,-1): 'wA'},
+            {(0,0): 'wQ', (0,1): 'bQ', (-1,0): 'wP', (0,2): 'bA',
+             (0,-1): 'wM', (0,3): 'bM', (-1,3): 'bS', (1,-2): 'wL'},
+            {(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wS', (1,1): 'bS',
+             (-1,0): 'wB', (-1,2): 'bB', (1,-2): 'wP', (0,3): 'bP'}
+        ]
+        
+        for pieces in positions:
+            board = hive.HiveBoard(queen_opening_allowed=True)
+            board.quick_setup(pieces)
+            board._log = [None] * 8
+            
+            for color in hive.Color:
+                plies = board.legal_plies(color)
+                for ply in plies:
+                    self.assertIs(board.validate(ply), ply)
+                
+                self.assertSetEqual({self.ply_key(p) for p in plies
+                                     if p.rule in {hive.Rule.Place,
+                                                   hive.Rule.Move,
+                                                   hive.Rule.Relocate}},
+                                    self.plies_by_trial(board, color))
+        
+        board = hive.HiveBoard()
+        board.quick_setup({(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wM', (1,-2): 'bP'})
+        board._log = [None] * 8
+        leeched = [p for p in board.legal_plies(hive.Color.White)
+                   if p.rule in {hive.Rule.Leech_Move, hive.Rule.Leech_Relocate}]
+        
+        self.assertTrue(leeched)
+        self.assertEqual(len(leeched), len({(p.rule, p.origin, p.dest) for p in leeched}))
+
+
+class TestTraversal(unittest.TestCase):
+    
+    def test_articulation(self):
+        offsets = hive.HiveBoard.OFFSETS[hive.Flat_Directions]
+        line = {(0,0), (0,1), (0,2), (5,5)}
+        graph = traversal.adjacency(line, offsets)
+        
+        self.assertEqual(sorted(graph[(0,1)]), [(0,0), (0,2)])
+        self.assertEqual(graph[(5,5)], [])
+        self.assertEqual(traversal.articulation(graph), (2, frozenset([(0,1)])))
+    
+    def test_breadth_first(self):
+        step = lambda c: [(c[0] + 1, c[1]), (c[0], c[1] + 1)] if c[0] < 3 else []
+        came_from = traversal.breadth_first((0,0), step, (1,1))
+        
+        self.assertEqual(traversal.path_to(came_from, (1,1)), [(0,0), (1,0), (1,1)])
+        self.assertNotIn((3,0), came_from) #stopped on reaching the goal
+        with self.assertRaises(KeyError):
+            traversal.path_to(came_from, (9,9))
+        
+class TestArrayBoard(unittest.TestCase):
+    
+    def test_mirrors_hiveboard(self):
+        pieces = {(0,0): 'wQ', (0,1): 'bQ', (0,-1): 'wB', (0,2): 'bM',
+                  (1,-2): 'wA', (-1,2): 'bB', (-1,0): 'wS'}
+        
+        board = hive.HiveBoard()
+        board.quick_setup(pieces)
+        array = arrayboard.ArrayBoard.from_board(board)
+        
+        for origin, dest in [((0,-1), (0,0)), ((-1,2), (0,2)),
+                             ((0,0), (1,0)), ((1,-2), (1,-1)),
+                             ((0,2), (0,1))]:
+            board.move(origin, dest)
+            array.move(origin, dest)
+            
+            self.assertEqual(len(array), len(board._pieces))
+            for coords, stack in board._pieces.items():
+                self.assertIn(coords, array)
+                self.assertEqual(array.stack_at(coords), stack)
+                self.assertEqual(array.piece_at(coords), board.piece_at(coords))
+                self.assertEqual(dict(array.neighbors(coords)),
+                                 dict(board.neighbors(coords)))
+            
+            for color in hive.Color:
+                self.assertSetEqual(set(array.valid_placements(color)),
+                                    set(board.valid_placements(color)))
+            self.assertEqual(array.articulation_points, board.articulation_points)
+        
+        t = array.remove((1,0))
+        self.assertEqual(t, board.remove((1,0)))
+        self.assertNotIn((1,0), array)
+        
+        with self.assertRaises(hive.IllegalMove):
+            array.place(t, (0,1))
+        with self.assertRaises(KeyError):
+            array.piece_at((5,5))
+        with self.assertRaises(IndexError):
+            array.place(t, (40,0))
+        self.assertNotIn((40,0), array)
+        
+        #tiles as near the edge as a small board allows
+        small = arrayboard.ArrayBoard(size=8)
+        board = hive.HiveBoard()
+        for coords, piece in [((1,0), 'wQ'), ((1,1), 'bQ'), ((-2,-2), 'wA'),
+                              ((-2,1), 'bA')]:
+            board.quick_setup({coords: piece})
+            small.place(board.piece_at(coords), coords)
+        for color in hive.Color:
+            self.assertSetEqual(set(small.valid_placements(color)),
+                                set(board.valid_placements(color)))
+        for coords in [(2,0), (0,2), (-3,0), (0,-3)]:
+            with self.assertRaises(IndexError):
+                small.place(t, coords)
+
+
+class TestEngine(unittest.TestCase):
+    
+    def setUp(self):
+        self.board = hive.HiveBoard()
+        self.board.quick_setup({
+            (0,0): 'bQ',
+            (0,-1): 'wQ',
+            (1,-1): 'wB',
+            (1,0): 'bA',
+            (0,1): 'bB',
+            (-1,1): 'wS',
+            (-2,1): 'wA',
+            (0,-2): 'bS'
+        })
+        self.board._log = [None] * 8
+    
+    def test_finds_winning_ply(self):
+        before = {k: list(v) for k,v in self.board._pieces.items()}
+        key = self.board.zobrist
+        
+        result = engine.Engine(max_depth=2).search(self.board, hive.Color.White)
+        
+        self.assertEqual((result.ply.origin, result.ply.dest), ((-2,1), (-1,0)))
+        self.assertGreaterEqual(result.score, engine.WIN - 2)
+        self.assertGreater(result.nodes, 0)
+        self.assertGreater(result.nps, 0)
+        
+        self.assertEqual(self.board._pieces, before)
+        self.assertEqual(self.board.zobrist, key)
+        self.assertEqual(self.board.ply_number, 8)
+    
+    def test_node_limit(self):
+        searcher = engine.Engine(max_depth=6, node_limit=50)
+        result = searcher.search(self.board, hive.Color.Black)
+        
+        self.assertLessEqual(result.nodes, 50)
+        self.assertIsInstance(result.ply, hive.Ply)
+        self.assertEqual(self.board.ply_number, 8)
+    
+    def test_parallel_search(self):
+        with engine.ParallelEngine(workers=2, max_depth=2) as searcher:
+            result = searcher.search(self.board, hive.Color.White)
+        
+        self.assertEqual((result.ply.origin, result.ply.dest), ((-2,1), (-1,0)))
+        self.assertEqual(result.score,
+                         engine.Engine(max_depth=2).search(self.board, hive.Color.White).score)
+        self.assertEqual(self.board.ply_number, 8)
+
+    def test_mcts(self):
+        legal = {engine.signature(p) for p in self.board.legal_plies(hive.Color.White)}
+        searcher = mcts.MCTS(playouts=300, playout_depth=6)
+        result = searcher.search(self.board, hive.Color.White)
+        
+        self.assertIn(engine.signature(result.ply), legal)
+        self.assertEqual(result.nodes, 300)
+        self.assertEqual(self.board.ply_number, 8)
+        
+        #with more playouts than root plies, every root ply is tried,
+        #and the winning one wins every playout through it
+        self.assertEqual(len(searcher.root.children), len(legal))
+        [winning] = [n for n in searcher.root.children
+                     if (getattr(n.ply, 'origin', None), n.ply.dest) == ((-2,1), (-1,0))]
+        self.assertEqual(winning.wins, winning.visits)
+        
+        reply = searcher.search(self.board, hive.Color.White)
+        self.assertEqual(searcher.root.visits, 600)
+        
+        self.board.make(reply.ply)
+        searcher.advance(reply.ply)
+        self.assertEqual(searcher.root.color, hive.Color.Black)
+        self.assertGreater(searcher.root.visits, 0)
+        
+class TestBench(unittest.TestCase):
+    
+    def test_corpus(self):
+        for name in bench.CORPUS:
+            board, color = bench.position(name)
+            self.assertTrue(board.one_hive_rule(), name)
+            self.assertIsNone(board.winner, name)
+            self.assertEqual(board.ply_number % 2, 0 if color is hive.Color.White else 1)
+        
+        board, color = bench.position('midgame_stacks')
+        self.assertEqual(board.stack_at((0,0)),
+                         [hive.Tile(hive.Color.White, hive.Insect.Mosquito),
+                          hive.Tile(hive.Color.White, hive.Insect.Beetle),
+                          hive.Tile(hive.Color.Black, hive.Insect.Beetle)])
+        self.assertEqual(len(board._pieces), 14)
+    
+    def test_compare(self):
+        baseline = {'opening': {'validate': {'ops': 100.0, 'peak': 0}}}
+        results = {'opening': {'validate': {'ops': 85.0, 'peak': 0},
+                               'perft(2)': {'ops': 1.0, 'peak': 0}}}
+        
+        self.assertEqual(bench.compare(results, baseline, 0.2), [])
+        self.assertEqual(bench.compare(results, baseline, 0.1),
+                         [('opening', 'validate', 0.85)])
+        
+class TestPerft(unittest.TestCase):
+    
+    def test_perft(self):
+        board = hive.HiveBoard()
+        
+        self.assertEqual(perft.perft(board, 0), 1)
+        self.assertEqual(perft.perft(board, 1), 7)
+        self.assertEqual(perft.perft(board, 2), 7 * 6 * 7)
+        self.assertEqual(board.ply_number, 0)
+        
+        board, color = bench.position('opening')
+        self.assertEqual(perft.perft(board, 1, color), len(board.legal_plies(color)))
+        self.assertEqual(board.ply_number, 6)
+    
+    def test_divide(self):
+        board, color = bench.position('opening')
+        results = perft.divide(board, 2, color)
+        
+        self.assertEqual([engine.signature(p) for p,n in results],
+                         [engine.signature(p) for p in board.legal_plies(color)])
+        self.assertEqual(sum(n for p,n in results), perft.perft(board, 2, color))
+        
+        shared = perft.divide(board, 2, color, workers=2)
+        self.assertEqual([n for p,n in shared], [n for p,n in results])
+        self.assertEqual([engine.signature(p) for p,n in shared],
+                         [engine.signature(p) for p,n in results])
+        
+
+def random_game(seed, plies=60, tile_orientation=hive.Flat_Directions):
+    """Returns a board after up to plies random legal plies"""
+    rng = random.Random(seed)
+    board = hive.HiveBoard(tile_orientation, queen_opening_allowed=True)
+    while board.ply_number < plies and board.winner is None:
+        legal = board.legal_plies(perft.side_to_move(board))
+        if not legal:
+            break
+        board.make(rng.choice(legal))
+    return board
+
+class TestRecord(unittest.TestCase):
+    
+    def test_save_load(self):
+        board = random_game(1)
+        f = io.BytesIO()
+        board.save_log(f)
+        self.assertLessEqual(len(f.getvalue()), record.HEADER.size + 9 * board.ply_number)
+        
+        f.seek(0)
+        loaded = hive.HiveBoard()
+        self.assertEqual(loaded.load_log(f), board.ply_number)
+        self.assertTrue(loaded.queen_opening_allowed)
+        self.assertEqual(loaded._pieces, board._pieces)
+        self.assertEqual(loaded.zobrist, board.zobrist)
+        self.assertEqual([engine.signature(p) for p in loaded._log],
+                         [engine.signature(p) for p in board._log])
+        
+        with self.assertRaises(ValueError):
+            loaded.load_log(f)
+        with self.assertRaises(EOFError):
+            hive.HiveBoard().load_log(f)
+    
+    def test_every_rule(self):
+        plies = [hive.Placement(hive.Tile(hive.Color.Black, hive.Insect.Pillbug), (-3,4)),
+                 hive.Movement((0,-1), (2,-3)),
+                 hive.Movement((0,-1), (0,0), (1,-1)),
+                 hive.Relocation((1,0), (-1,1), (0,1)),
+                 hive.Relocation((1,0), (-1,1), (0,1), (-1,0))]
+        plies[1].tile = hive.Tile(hive.Color.White, hive.Insect.Ant)
+        
+        data = b''.join(record.encode_ply(p) for p in plies)
+        self.assertEqual(len(data), 3 + 5 + 7 + 7 + 9)
+        
+        for ply, decoded in zip(plies, map(record.to_ply, record.iter_records(data))):
+            self.assertEqual(engine.signature(decoded), engine.signature(ply))
+            self.assertIs(decoded.tile, ply.tile)
+            self.assertEqual(getattr(decoded, 'leech_from', None),
+                             getattr(ply, 'leech_from', None))
+        
+        with self.assertRaises(ValueError):
+            record.encode_ply(hive.Movement((0,0), (0,200)))
+    
+    def test_stream(self):
+        games = [random_game(0, 40), random_game(1, 40, hive.Pointed_Directions),
+                 random_game(2, 40)]
+        
+        f = io.BytesIO()
+        for board in games:
+            record.write_game(f, board)
+        f.seek(0)
+        
+        for board, game in zip(games, record.read_games(f)):
+            self.assertIs(game.tile_orientation, board.tile_orientation)
+            self.assertEqual(game.ply_count, board.ply_number)
+            for replayed in game.replay():
+                pass
+            self.assertEqual(replayed._pieces, board._pieces)
+            self.assertEqual(replayed.zobrist, board.zobrist)
+        self.assertIsNone(record.read_game(f))
+        
+        f = io.BytesIO(b'XX' + bytes(6))
+        with self.assertRaises(ValueError):
+            record.read_game(f)
+        
+
+class TestReplay(unittest.TestCase):
+    
+    def test_seek(self):
+        game = random_game(2, 70)
+        f = io.BytesIO()
+        game.save_log(f)
+        f.seek(0)
+        replayer = replay.Replayer.from_record(record.read_game(f), interval=8)
+        
+        rng = random.Random(0)
+        for n in [game.ply_number, 0, 33, 32, 9, 60, 61, 17, 70] + \
+                 [rng.randrange(game.ply_number + 1) for i in range(20)]:
+            board = replayer.seek(n)
+            self.assertIs(board, replayer.board)
+            expected = hive.HiveBoard(queen_opening_allowed=True)
+            for ply in game._log[:n]:
+                expected.make(ply)
+            self.assertEqual(board.ply_number, n)
+            self.assertEqual(board._pieces, expected._pieces)
+            self.assertEqual(board.zobrist, expected.zobrist)
+            self.assertEqual(board.perimeter, expected.perimeter)
+            self.assertEqual(board.piece_counts, expected.piece_counts)
+        
+        with self.assertRaises(IndexError):
+            replayer.seek(game.ply_number + 1)
+    
+    def test_validation(self):
+        game = random_game(3, 12)
+        plies = list(game._log)
+        plies.insert(6, hive.Movement((0,0), (5,5)))
+        
+        replayer = replay.Replayer(plies, hive.HiveBoard(queen_opening_allowed=True))
+        replayer.seek(6)
+        with self.assertRaises(hive.IllegalMove):
+            replayer.forward()
+        self.assertEqual(replayer.ply_number, 6)
+        
+        trusting = replay.Replayer(game._log, hive.HiveBoard(queen_opening_allowed=True),
+                                   interval=4, trusted=True)
+        self.assertEqual(trusting.seek(12)._pieces, game._pieces)
+        
+        with self.assertRaises(ValueError):
+            replay.Replayer(plies, game)
+        
+
+class TestNotation(unittest.TestCase):
+    
+    def test_parse(self):
+        game = notation.load('Base+MLP;InProgress;White[3];wS1;bG1 -wS1;wA1 wS1/;bG2 /bG1')
+        self.assertEqual(game.locations, {'wS1': (0,0), 'bG1': (-1,0),
+                                          'wA1': (1,-1), 'bG2': (-2,1)})
+        self.assertEqual(game.board.piece_at((-2,1)),
+                         hive.Tile(hive.Color.Black, hive.Insect.Grasshopper))
+        self.assertEqual(game.game_string(),
+                         'Base+MLP;InProgress;White[3];wS1;bG1 -wS1;wA1 wS1/;bG2 /bG1')
+        
+        ply = game.parse('wA1 bG2\\')
+        self.assertEqual((ply.rule, ply.origin, ply.dest), (hive.Rule.Move, (1,-1), (-2,2)))
+        self.assertIs(game.parse('pass').rule, hive.Rule.Pass)
+        
+        for bad in ['wA3 -bG1', 'wA1 -bG3', 'wX1 wS1', 'bG1']:
+            with self.assertRaises(ValueError):
+                game.parse(bad)
+        with self.assertRaises(hive.IllegalMove):
+            game.play('wA2 bG2-')
+    
+    def test_round_trip(self):
+        for seed in range(3):
+            board = random_game(seed, 80)
+            
+            follow = notation.Notation(hive.HiveBoard(queen_opening_allowed=True))
+            for ply in board._log:
+                follow.play(ply, trusted=True)
+            
+            game = notation.load(follow.game_string(),
+                                 hive.HiveBoard(queen_opening_allowed=True))
+            self.assertEqual(game.board._pieces, board._pieces)
+            self.assertEqual(game.moves, follow.moves)
+            
+            #a tile a pillbug carries might instead have moved itself
+            self.assertEqual([(getattr(p, 'origin', None), p.dest) for p in game.board._log],
+                             [(getattr(p, 'origin', None), p.dest) for p in board._log])
+    
+    def test_import_games(self):
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            for name, text in [('good', 'Base+MLP;InProgress;Black[1];wS1'),
+                               ('bad', 'Base+MLP;InProgress;White[2];wS1;wG1 wS1-')]:
+                paths.append(os.path.join(folder, name))
+                with open(paths[-1], 'w') as f:
+                    f.write(text)
+            
+            for workers in [1, 2]:
+                results = notation.import_games(paths, workers, trusted=False)
+                self.assertEqual([path for path, data, error in results], paths)
+                (good, data, error), (bad, nothing, problem) = results
+                self.assertIsNone(error)
+                self.assertEqual(record.read_game(io.BytesIO(data)).ply_count, 1)
+                self.assertIsNone(nothing)
+                self.assertIn('IllegalMove', problem)
+        
+
+class TestSelfPlay(unittest.TestCase):
+    
+    def test_pass(self):
+        board = hive.HiveBoard()
+        self.assertIs(board.check(hive.Pass()).violation, hive.Violation.May_Not_Pass)
+        
+        board.quick_setup({(0,0): 'bQ', (0,1): 'bA'})
+        board._log = [None] * 8
+        self.assertEqual(board.legal_plies(hive.Color.White), [])
+        board.perform(hive.Pass())
+        self.assertEqual(board.ply_number, 9)
+        self.assertIs(board.unmake().rule, hive.Rule.Pass)
+        
+        #searches pass by making a Pass, keeping the side to move right
+        [(ply, count)] = perft.divide(board, 2)
+        self.assertIs(ply.rule, hive.Rule.Pass)
+        self.assertEqual(count, len(board.legal_plies(hive.Color.Black)))
+        self.assertEqual(board.ply_number, 8)
+        
+        def evaluate(board, color):
+            self.assertIs(perft.side_to_move(board), color)
+            return 0
+        board._log = [None] * 9
+        engine.Engine(3, evaluate=evaluate).search(board, hive.Color.Black)
+        self.assertEqual(board.ply_number, 9)
+        
+        board._log = [None] * 8
+        tree = mcts.MCTS(playouts=20, playout_depth=4, seed=1)
+        ply = tree.best_ply(board, hive.Color.White)
+        self.assertIs(ply.rule, hive.Rule.Pass)
+        board.make(ply)
+        tree.advance(hive.Pass())
+        self.assertIsNotNone(tree.root)
+        self.assertGreater(tree.root.visits, 0)
+        board.unmake()
+        
+        board = selfplay.play_game(lambda board, color, rng: None, opening=3)
+        self.assertEqual(board.ply_number, 5)
+        self.assertEqual([p.rule for p in board._log[3:]], [hive.Rule.Pass] * 2)
+        self.assertEqual(notation.Notation().emit(board._log[-1]), 'pass')
+    
+    def test_run(self):
+        f = io.BytesIO()
+        stats = selfplay.run(3, f, max_plies=30, seed=5)
+        self.assertEqual(stats['games'], 3)
+        self.assertGreater(stats['plies_per_second'], 0)
+        
+        f.seek(0)
+        games = list(record.read_games(f))
+        self.assertEqual(sum(g.ply_count for g in games), stats['plies'])
+        
+        board = selfplay.play_game(selfplay.random_policy, 5, 30)
+        loaded = hive.HiveBoard()
+        loaded.load_log(io.BytesIO(f.getvalue()))
+        self.assertEqual(loaded._pieces, board._pieces)
+        for ply in reversed(list(loaded._log)):
+            loaded.unmake()
+            self.assertIsNone(loaded.check(ply).violation)
+        
+@unittest.skipIf(batch is None, 'numpy is not installed')
+class TestBatch(unittest.TestCase):
+    
+    def test_encode(self):
+        board = hive.HiveBoard()
+        board.quick_setup({(0,0): 'wQ', (0,1): ['bQ', 'wB'], (0,-1): 'bA'})
+        self.assertEqual(batch.center(board), (0,0))
+        
+        planes = batch.encode([board, hive.HiveBoard()], [hive.Color.White, hive.Color.Black])
+        half = batch.WINDOW // 2
+        self.assertEqual(planes.shape, (2, 16 * batch.HEIGHTS + 1, batch.WINDOW, batch.WINDOW))
+        self.assertEqual(planes[:, :batch.PINNED].sum(), 4)
+        self.assertEqual(planes[0, batch.PINNED, half, half], 1)
+        self.assertEqual(planes[0, 0, half, half], 1)
+        self.assertEqual(planes[0, 8, half, half + 1], 1)
+        self.assertEqual(planes[0, 16 + hive.Tile(hive.Color.White, hive.Insect.Beetle).code,
+                                half, half + 1], 1)
+        
+        flipped = batch.encode([board], [hive.Color.Black])
+        self.assertEqual(flipped[0, 8, half, half], 1)
+        self.assertEqual(flipped[0, 0, half, half + 1], 1)
+        
+        board.quick_setup({(0,-20): 'wA', (0,20): 'bA'})
+        self.assertEqual(batch.center(board), (0,0))
+        with self.assertRaises(ValueError):
+            batch.encode([board], size=5)
+        self.assertEqual(batch.encode([board]).shape[-1], 41)
+        self.assertEqual(batch.encode([board])[:, :batch.PINNED].sum(), 6)
+    
+    def test_evaluate(self):
+        boards, colors = [], []
+        for seed in range(40):
+            board = random_game(seed, 16 if seed < 20 else 60)
+            boards.extend([board, board])
+            colors.extend(hive.Color)
+        
+        self.assertEqual(list(batch.score(boards, colors)),
+                         [engine.evaluate(b, c) for b, c in zip(boards, colors)])
+        self.assertEqual(batch.features(boards, colors).shape,
+                         (len(boards), len(hive.HiveBoard.FEATURES)))
+        
+        #a ring leaves each of its tiles free, though none has its
+        #neighbors in one unbroken arc
+        ring = hive.HiveBoard()
+        ring.quick_setup({(0,0): 'wQ', (1,-1): 'bQ', (2,-1): 'wA', (2,0): 'wA',
+                          (1,1): 'wA', (0,1): 'bA'})
+        self.assertEqual(engine.evaluate(ring, hive.Color.White), 2)
+        self.assertEqual(batch.score([ring], [hive.Color.White])[0], 2)
+        
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
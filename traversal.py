@@ -0,0 +1,182 @@
+"""Searches over hex coordinates, shared by the rule checks in hive
+"""
+
+__author__ = "William Dizon"
+__license__ = "Simplified BSD License"
+__version__ = "0.0.1"
+__email__ = "wdchromium@gmail.com"
+
+from collections import deque
+
+def adjacency(nodes, offsets):
+    """
+    Returns a dict of each node to the list of its neighbors also
+    in nodes.  Only the offsets pointing "forward" are followed, each
+    link found being recorded at both ends, so every neighbor's
+    coordinates are worked out once here; the searches below then
+    only ever follow existing keys.
+    """
+    retval = {node: [] for node in nodes}
+    forward = [(dq, dr) for dq, dr in offsets if (dq, dr) > (0, 0)]
+
+    for node, adjacent in retval.items():
+        q, r = node
+        for dq, dr in forward:
+            n = (q + dq, r + dr)
+            other = retval.get(n)
+            if other is not None:
+                adjacent.append(n)
+                other.append(node)
+    return retval
+
+def breadth_first(start, step, goal=None):
+    """
+    Searches outward from start, asking step(current) for the hexes
+    to go on to, and returns a dict of every hex reached to the hex
+    it was first reached from (start mapping to None).  Stops as
+    soon as goal, if given, is reached.
+    """
+    came_from = {start: None}
+    frontier = deque([start])
+    popleft, append = frontier.popleft, frontier.append
+
+    while frontier:
+        current = popleft()
+        for n in step(current):
+            if n not in came_from:
+                came_from[n] = current
+                if n == goal:
+                    return came_from
+                append(n)
+    return came_from
+
+def slide(origin, occupied, offsets, gates, contact, goal=None):
+    """
+    Floods outward from origin as a tile sliding around occupied,
+    returning a dict like breadth_first's, and likewise stopping
+    early at goal.  A hex is only slid into if it is empty and not
+    gated shut by two occupied hexes, and only slid out of if it is
+    origin or in contact (the hexes touching the hive).
+    """
+    came_from = {origin: None}
+    frontier = deque([origin])
+    popleft, append = frontier.popleft, frontier.append
+
+    while frontier:
+        current = popleft()
+        if current != origin and current not in contact:
+            continue
+
+        q, r = current
+        for dq, dr in offsets:
+            n = (q + dq, r + dr)
+            if n in came_from or n in occupied:
+                continue
+            (aq, ar), (bq, br) = gates[(dq, dr)]
+            if (q + aq, r + ar) in occupied and (q + bq, r + br) in occupied:
+                continue
+            came_from[n] = current
+            if n == goal:
+                return came_from
+            append(n)
+    return came_from
+
+def walks(origin, occupied, offsets, gates, steps):
+    """
+    Returns a dict of every hex a sliding tile ends on after exactly
+    steps slides from origin, never revisiting a hex, to the first
+    path found that gets it there.  occupied must not include the
+    moving tile.  Every hex slid into must be empty, and each slide
+    must pass between the two hexes flanking it with exactly one of
+    them occupied: both and the gap is shut, neither and the tile
+    would leave the hive.
+    """
+    found = {}
+    path = [origin]
+
+    def extend(q, r):
+        for dq, dr in offsets:
+            n = (q + dq, r + dr)
+            if n in occupied or n in path:
+                continue
+            (aq, ar), (bq, br) = gates[(dq, dr)]
+            if ((q + aq, r + ar) in occupied) == ((q + bq, r + br) in occupied):
+                continue
+
+            path.append(n)
+            if len(path) > steps:
+                found.setdefault(n, tuple(path))
+            else:
+                extend(*n)
+            path.pop()
+
+    extend(*origin)
+    return found
+
+def path_to(came_from, dest):
+    """
+    Follows a dict from breadth_first or slide back from dest,
+    returning the path from the start.  Raises KeyError if dest
+    was never reached.
+    """
+    retval = [dest]
+    current = came_from[dest]
+    while current is not None:
+        retval.append(current)
+        current = came_from[current]
+    retval.reverse()
+    return retval
+
+def articulation(graph):
+    """
+    Returns (number of connected components, frozenset of
+    articulation points) of a graph from adjacency(), found with a
+    single iterative Hopcroft-Tarjan depth-first search.
+    """
+    depth = {}
+    low = {}
+    points = set()
+    components = 0
+
+    for root in graph:
+        if root in depth:
+            continue
+
+        components += 1
+        children = 0
+        depth[root] = low[root] = 0
+
+        #the search stack, kept as parallel lists
+        nodes, parents, remaining = [root], [None], [iter(graph[root])]
+
+        while nodes:
+            current = nodes[-1]
+            for n in remaining[-1]:
+                if n == parents[-1]:
+                    continue
+                elif n in depth:
+                    if depth[n] < low[current]:
+                        low[current] = depth[n]
+                else:
+                    depth[n] = low[n] = depth[current] + 1
+                    nodes.append(n)
+                    parents.append(current)
+                    remaining.append(iter(graph[n]))
+                    break
+            else:
+                nodes.pop()
+                remaining.pop()
+                parent = parents.pop()
+                if parent is None:
+                    continue
+                if low[current] < low[parent]:
+                    low[parent] = low[current]
+                if parent == root:
+                    children += 1
+                elif low[current] >= depth[parent]:
+                    points.add(parent)
+
+        if children > 1:
+            points.add(root)
+
+    return (components, frozenset(points))